@@ -8,13 +8,26 @@ import time
 import flask
 import sqlalchemy
 
+import compression
+import constants
 from models import Permission, Role, User, db
+import responses
 from routes.auth import auth_blueprint
 from routes.errors import handle_error
 from routes.roles import roles_blueprint
 from routes.stands import stands_blueprint
 from routes.tokens import tokens_blueprint
 from routes.users import users_blueprint
+import services.auth
+import services.janitor
+import services.last_seen
+import services.near_me_cache
+import services.password
+import services.permission
+import services.sale_writer
+import services.stand_index
+import services.stand_map
+import services.throttle
 import services.user
 
 
@@ -31,6 +44,8 @@ def create_app() -> flask.Flask:
     app.register_blueprint(roles_blueprint)
 
     app.register_error_handler(Exception, handle_error)
+    responses.init_app(app)
+    compression.init_app(app)
 
     # Configure the SQLite database, relative to the app instance folder
     app.config["SQLALCHEMY_DATABASE_URI"] = os.environ["SQLALCHEMY_DATABASE_URI"]
@@ -39,9 +54,145 @@ def create_app() -> flask.Flask:
     app.config["JWT_ISSUER"] = os.environ["JWT_ISSUER"]
     app.config["JWT_AUDIENCE"] = os.environ["JWT_AUDIENCE"]
     app.config["JWT_ALGORITHM"] = os.environ["JWT_ALGORITHM"]
+    app.config["JWT_COMPACT_PERMISSIONS"] = os.environ.get(
+        "JWT_COMPACT_PERMISSIONS", ""
+    ).lower() in ("1", "true", "yes")
+    app.config["ROLE_PERMISSIONS_MAX_AGE"] = float(
+        os.environ.get(
+            "ROLE_PERMISSIONS_MAX_AGE", constants.DEFAULT_ROLE_PERMISSIONS_MAX_AGE
+        )
+    )
+    app.config["ACCESS_TOKEN_CACHE_SIZE"] = int(
+        os.environ.get(
+            "ACCESS_TOKEN_CACHE_SIZE", constants.DEFAULT_ACCESS_TOKEN_CACHE_SIZE
+        )
+    )
+    app.config["ACCESS_TOKEN_CACHE_TTL"] = int(
+        os.environ.get(
+            "ACCESS_TOKEN_CACHE_TTL", constants.DEFAULT_ACCESS_TOKEN_CACHE_TTL
+        )
+    )
+    app.config["LAST_SEEN_FLUSH_INTERVAL"] = float(
+        os.environ.get(
+            "LAST_SEEN_FLUSH_INTERVAL", constants.DEFAULT_LAST_SEEN_FLUSH_INTERVAL
+        )
+    )
+    app.config["LAST_SEEN_BUFFER_SIZE"] = int(
+        os.environ.get("LAST_SEEN_BUFFER_SIZE", constants.DEFAULT_LAST_SEEN_BUFFER_SIZE)
+    )
+    app.config["PASSWORD_HASH_POOL_SIZE"] = int(
+        os.environ.get("PASSWORD_HASH_POOL_SIZE", os.cpu_count() or 1)
+    )
+    app.config["PASSWORD_HASH_QUEUE_DEPTH"] = int(
+        os.environ.get(
+            "PASSWORD_HASH_QUEUE_DEPTH", constants.DEFAULT_PASSWORD_HASH_QUEUE_DEPTH
+        )
+    )
+    app.config["LOGIN_IP_THROTTLE_RATE"] = float(
+        os.environ.get(
+            "LOGIN_IP_THROTTLE_RATE", constants.DEFAULT_LOGIN_IP_THROTTLE_RATE
+        )
+    )
+    app.config["LOGIN_IP_THROTTLE_BURST"] = int(
+        os.environ.get(
+            "LOGIN_IP_THROTTLE_BURST", constants.DEFAULT_LOGIN_IP_THROTTLE_BURST
+        )
+    )
+    app.config["LOGIN_EMAIL_THROTTLE_RATE"] = float(
+        os.environ.get(
+            "LOGIN_EMAIL_THROTTLE_RATE", constants.DEFAULT_LOGIN_EMAIL_THROTTLE_RATE
+        )
+    )
+    app.config["LOGIN_EMAIL_THROTTLE_BURST"] = int(
+        os.environ.get(
+            "LOGIN_EMAIL_THROTTLE_BURST", constants.DEFAULT_LOGIN_EMAIL_THROTTLE_BURST
+        )
+    )
+    app.config["LOGIN_THROTTLE_MAX_KEYS"] = int(
+        os.environ.get(
+            "LOGIN_THROTTLE_MAX_KEYS", constants.DEFAULT_LOGIN_THROTTLE_MAX_KEYS
+        )
+    )
+    app.config["TOKEN_JANITOR_INTERVAL"] = float(
+        os.environ.get(
+            "TOKEN_JANITOR_INTERVAL", constants.DEFAULT_TOKEN_JANITOR_INTERVAL
+        )
+    )
+    app.config["TOKEN_RETENTION"] = float(
+        os.environ.get("TOKEN_RETENTION", constants.DEFAULT_TOKEN_RETENTION)
+    )
+    app.config["TOKEN_JANITOR_BATCH_SIZE"] = int(
+        os.environ.get(
+            "TOKEN_JANITOR_BATCH_SIZE", constants.DEFAULT_TOKEN_JANITOR_BATCH_SIZE
+        )
+    )
+    app.config["SALES_BATCH_MAX_SIZE"] = int(
+        os.environ.get("SALES_BATCH_MAX_SIZE", constants.DEFAULT_SALES_BATCH_MAX_SIZE)
+    )
+    app.config["COMPRESSION_MIN_SIZE"] = int(
+        os.environ.get("COMPRESSION_MIN_SIZE", constants.DEFAULT_COMPRESSION_MIN_SIZE)
+    )
+    app.config["SALE_WRITE_QUEUE_ENABLED"] = os.environ.get(
+        "SALE_WRITE_QUEUE_ENABLED", ""
+    ).lower() in ("1", "true", "yes")
+    app.config["SALE_WRITE_QUEUE_WINDOW"] = float(
+        os.environ.get(
+            "SALE_WRITE_QUEUE_WINDOW", constants.DEFAULT_SALE_WRITE_QUEUE_WINDOW
+        )
+    )
+    app.config["SALE_WRITE_QUEUE_MAX_BATCH_SIZE"] = int(
+        os.environ.get(
+            "SALE_WRITE_QUEUE_MAX_BATCH_SIZE",
+            constants.DEFAULT_SALE_WRITE_QUEUE_MAX_BATCH_SIZE,
+        )
+    )
+    app.config["SALE_WRITE_QUEUE_TIMEOUT"] = float(
+        os.environ.get(
+            "SALE_WRITE_QUEUE_TIMEOUT", constants.DEFAULT_SALE_WRITE_QUEUE_TIMEOUT
+        )
+    )
+    app.config["STAND_INDEX_ENABLED"] = os.environ.get(
+        "STAND_INDEX_ENABLED", ""
+    ).lower() in ("1", "true", "yes")
+    app.config["STAND_INDEX_CELL_SIZE"] = float(
+        os.environ.get("STAND_INDEX_CELL_SIZE", constants.DEFAULT_STAND_INDEX_CELL_SIZE)
+    )
+    app.config["STAND_INDEX_MAX_AGE"] = float(
+        os.environ.get("STAND_INDEX_MAX_AGE", constants.DEFAULT_STAND_INDEX_MAX_AGE)
+    )
+    app.config["NEAR_ME_CACHE_SIZE"] = int(
+        os.environ.get("NEAR_ME_CACHE_SIZE", constants.DEFAULT_NEAR_ME_CACHE_SIZE)
+    )
+    app.config["NEAR_ME_CACHE_TTL"] = float(
+        os.environ.get("NEAR_ME_CACHE_TTL", constants.DEFAULT_NEAR_ME_CACHE_TTL)
+    )
+    app.config["NEAR_ME_CACHE_PRECISION"] = int(
+        os.environ.get(
+            "NEAR_ME_CACHE_PRECISION", constants.DEFAULT_NEAR_ME_CACHE_PRECISION
+        )
+    )
+    app.config["NEAR_ME_CACHE_MAX_CANDIDATES"] = int(
+        os.environ.get(
+            "NEAR_ME_CACHE_MAX_CANDIDATES",
+            constants.DEFAULT_NEAR_ME_CACHE_MAX_CANDIDATES,
+        )
+    )
+    app.config["STAND_TILE_CACHE_SIZE"] = int(
+        os.environ.get(
+            "STAND_TILE_CACHE_SIZE", constants.DEFAULT_STAND_TILE_CACHE_SIZE
+        )
+    )
+    app.config["STAND_TILE_CACHE_TTL"] = float(
+        os.environ.get("STAND_TILE_CACHE_TTL", constants.DEFAULT_STAND_TILE_CACHE_TTL)
+    )
 
     # initialize the app with the extension
     db.init_app(app)
+    services.auth.init_app(app)
+    services.last_seen.init_app(app)
+    services.password.init_app(app)
+    services.throttle.init_app(app)
+    services.sale_writer.init_app(app)
     with app.app_context():
         db_available = False
         backoff = 2
@@ -124,10 +275,21 @@ def create_app() -> flask.Flask:
             except sqlalchemy.exc.IntegrityError:
                 db.session.rollback()
                 logger.info("Only create admin account once")
+
+    # load caches and start background jobs once the tables exist
+    services.permission.init_app(app)
+    services.stand_index.init_app(app)
+    services.near_me_cache.init_app(app)
+    services.stand_map.init_app(app)
+    services.janitor.init_app(app)
+
     return app
 
 
-app = create_app()
+# The password hashing workers run this file again as __mp_main__ when they
+# start, and must not create an app, and reset the database, of their own.
+if __name__ != "__mp_main__":
+    app = create_app()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,117 @@
+"""Benchmark password hash cost against request latency.
+
+Runs bursts of concurrent password checks for several hash methods, both
+inline on the request threads and through ``services.password.PasswordHasher``.
+While a burst runs, a probe thread measures how long a cheap request has to
+wait, which shows how much hashing stalls the rest of the worker.
+
+Usage (from ``src``)::
+
+    python -m benchmarks.bench_password_hashing --concurrency 16 --requests 64
+"""
+import argparse
+import concurrent.futures
+import os
+import statistics
+import threading
+import time
+
+import werkzeug.security
+
+from services.password import PasswordHasher
+
+HASH_METHODS = ["pbkdf2:sha256:100000", "pbkdf2:sha256:600000", "scrypt"]
+
+
+def percentile(samples: list[float], percent: float) -> float:
+    samples = sorted(samples)
+    index = min(len(samples) - 1, int(round(percent / 100 * (len(samples) - 1))))
+    return samples[index]
+
+
+def probe(stop: threading.Event, latencies: list[float]) -> None:
+    """Repeatedly time a tiny piece of work, like a cheap GET request."""
+    while not stop.is_set():
+        started = time.perf_counter()
+        sum(range(1_000))
+        latencies.append(time.perf_counter() - started)
+        time.sleep(0.001)
+
+
+def run_burst(
+    check: callable,
+    password_hash: str,
+    concurrency: int,
+    requests: int,
+) -> tuple[list[float], list[float], float]:
+    login_latencies: list[float] = []
+    probe_latencies: list[float] = []
+    stop = threading.Event()
+    probe_thread = threading.Thread(target=probe, args=(stop, probe_latencies))
+    probe_thread.start()
+
+    def login() -> None:
+        started = time.perf_counter()
+        check(password_hash, "password")
+        login_latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(login) for _ in range(requests)]:
+            future.result()
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    probe_thread.join()
+    return login_latencies, probe_latencies, elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--pool-size", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    hasher = PasswordHasher(
+        pool_size=args.pool_size,
+        max_queue_depth=args.requests,
+    )
+    modes = {
+        "inline": werkzeug.security.check_password_hash,
+        "pool": hasher.check_password_hash,
+    }
+
+    print(
+        f"{'method':<24}{'mode':<8}{'hash ms':>10}{'logins/s':>10}"
+        f"{'p50 ms':>10}{'p99 ms':>10}{'probe p99 ms':>14}"
+    )
+    try:
+        for method in HASH_METHODS:
+            password_hash = werkzeug.security.generate_password_hash(
+                "password", method=method
+            )
+            started = time.perf_counter()
+            werkzeug.security.check_password_hash(password_hash, "password")
+            hash_cost = time.perf_counter() - started
+
+            for mode, check in modes.items():
+                logins, probes, elapsed = run_burst(
+                    check=check,
+                    password_hash=password_hash,
+                    concurrency=args.concurrency,
+                    requests=args.requests,
+                )
+                print(
+                    f"{method:<24}{mode:<8}{hash_cost * 1000:>10.1f}"
+                    f"{args.requests / elapsed:>10.1f}"
+                    f"{statistics.median(logins) * 1000:>10.1f}"
+                    f"{percentile(logins, 99) * 1000:>10.1f}"
+                    f"{percentile(probes, 99) * 1000:>14.2f}"
+                )
+    finally:
+        hasher.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Benchmark listing sales as ORM objects against column-projected rows.
+
+Loads a stand's sales either as full ``LemonadeStandSale`` objects, tracked
+in the session's identity map, or as the read-only rows the sales listings
+now select, and serializes them with ``responses.dump_json`` like the
+endpoints do.  Reports the median time and peak Python memory of each.
+
+Needs a PostGIS database.  Tables are created if missing, and a
+benchmark user and stand with ``--rows`` sales are added to it, so use a
+scratch database.
+
+Usage (from ``src``)::
+
+    python -m benchmarks.bench_projected_rows --database-url postgresql://... \\
+        --rows 10000 --repeat 10
+"""
+import argparse
+import datetime
+import os
+import statistics
+import time
+import tracemalloc
+import uuid
+
+import flask
+
+import services.stand
+from models import LemonadeStand, LemonadeStandSale, User, db
+from responses import dump_json
+from serialization import LemonadeSaleResponse
+
+
+def create_stand(app: flask.Flask, rows: int) -> int:
+    now = datetime.datetime.now(tz=datetime.timezone.utc)
+    suffix = uuid.uuid4().hex[:8]
+    with app.app_context():
+        db.create_all()
+        user = User(
+            email=f"bench.{suffix}@lemonademail.com",
+            password_hash="",
+            first_name="bench",
+            last_name="bench",
+            age=99,
+            created_at=now,
+            updated_at=now,
+        )
+        stand = LemonadeStand(
+            name=f"bench {suffix}",
+            location="POINT(13.002804 55.594707)",
+            owner=user,
+            currency="USD",
+            current_price_in_micros=1_000_000,
+            created_at=now,
+            updated_at=now,
+        )
+        db.session.add_all([user, stand])
+        db.session.flush()
+        services.stand.insert_lemonade_stand_sales(
+            [
+                dict(
+                    lemonade_stand_id=stand.id,
+                    currency="USD",
+                    price_in_micros=1_000_000,
+                    date=now - datetime.timedelta(minutes=i),
+                )
+                for i in range(rows)
+            ]
+        )
+        db.session.commit()
+        return stand.id
+
+
+def measure(app: flask.Flask, load: callable, repeat: int) -> tuple[float, int]:
+    timings = []
+    peak = 0
+    for _ in range(repeat):
+        # A new app context starts with an empty session, like a request.
+        with app.app_context():
+            tracemalloc.start()
+            started = time.perf_counter()
+            body = dump_json(load(), list[LemonadeSaleResponse], from_attributes=True)
+            timings.append(time.perf_counter() - started)
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+            assert body
+
+    return statistics.median(timings), peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--database-url", default=os.environ.get("SQLALCHEMY_DATABASE_URI")
+    )
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    app = flask.Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = args.database_url
+    db.init_app(app)
+    stand_id = create_stand(app, args.rows)
+
+    modes = {
+        "orm": lambda: LemonadeStandSale.query.filter_by(
+            lemonade_stand_id=stand_id
+        ).all(),
+        "projected": lambda: services.stand._lemonade_stand_sales_query(stand_id).all(),
+    }
+
+    print(f"{'mode':<12}{'rows':>8}{'ms':>10}{'peak MiB':>10}")
+    for mode, load in modes.items():
+        elapsed, peak = measure(app, load, args.repeat)
+        print(
+            f"{mode:<12}{args.rows:>8}{elapsed * 1000:>10.1f}" f"{peak / 2**20:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
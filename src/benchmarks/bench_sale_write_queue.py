@@ -0,0 +1,149 @@
+"""Benchmark single-sale commits against the group-commit sale write queue.
+
+Concurrent requests each report one sale, either committing it on their
+own connection or through ``services.sale_writer.SaleWriteQueue`` with
+several collection windows.  Reports commits per second next to the
+request latency, to pick a window that raises throughput without hurting
+p99 too much.
+
+Needs a PostGIS database.  Tables are created if missing, and a
+benchmark user and stand are added to it, so use a scratch database.
+
+Usage (from ``src``)::
+
+    python -m benchmarks.bench_sale_write_queue --database-url postgresql://... \\
+        --concurrency 32 --sales 5000 --windows 0.005 0.01 0.02
+"""
+import argparse
+import concurrent.futures
+import datetime
+import os
+import statistics
+import time
+import uuid
+
+import flask
+
+import services.stand
+from models import LemonadeStand, User, db
+from services.sale_writer import SaleWriteQueue
+
+
+def percentile(samples: list[float], percent: float) -> float:
+    samples = sorted(samples)
+    index = min(len(samples) - 1, int(round(percent / 100 * (len(samples) - 1))))
+    return samples[index]
+
+
+def create_stand(app: flask.Flask) -> int:
+    now = datetime.datetime.now(tz=datetime.timezone.utc)
+    suffix = uuid.uuid4().hex[:8]
+    with app.app_context():
+        db.create_all()
+        user = User(
+            email=f"bench.{suffix}@lemonademail.com",
+            password_hash="",
+            first_name="bench",
+            last_name="bench",
+            age=99,
+            created_at=now,
+            updated_at=now,
+        )
+        stand = LemonadeStand(
+            name=f"bench {suffix}",
+            location="POINT(13.002804 55.594707)",
+            owner=user,
+            currency="USD",
+            current_price_in_micros=1_000_000,
+            created_at=now,
+            updated_at=now,
+        )
+        db.session.add_all([user, stand])
+        db.session.commit()
+        return stand.id
+
+
+def run(sell: callable, concurrency: int, sales: int) -> tuple[list[float], float]:
+    latencies: list[float] = []
+
+    def request() -> None:
+        started = time.perf_counter()
+        sell()
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(request) for _ in range(sales)]:
+            future.result()
+    return latencies, time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--database-url", default=os.environ.get("SQLALCHEMY_DATABASE_URI")
+    )
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--sales", type=int, default=5_000)
+    parser.add_argument("--windows", type=float, nargs="+", default=[0.005, 0.01, 0.02])
+    parser.add_argument("--max-batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    app = flask.Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = args.database_url
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {"pool_size": args.concurrency}
+    db.init_app(app)
+    stand_id = create_stand(app)
+
+    def sale() -> dict:
+        return dict(
+            lemonade_stand_id=stand_id,
+            currency="USD",
+            price_in_micros=1_000_000,
+            date=datetime.datetime.now(tz=datetime.timezone.utc),
+        )
+
+    def sell_directly() -> None:
+        with app.app_context():
+            services.stand.insert_lemonade_stand_sales([sale()])
+            db.session.commit()
+
+    print(
+        f"{'mode':<16}{'sales/s':>10}{'commits/s':>11}"
+        f"{'sales/commit':>14}{'p50 ms':>10}{'p99 ms':>10}"
+    )
+
+    latencies, elapsed = run(sell_directly, args.concurrency, args.sales)
+    print(
+        f"{'direct':<16}{args.sales / elapsed:>10.0f}{args.sales / elapsed:>11.0f}"
+        f"{1:>14.1f}{statistics.median(latencies) * 1000:>10.1f}"
+        f"{percentile(latencies, 99) * 1000:>10.1f}"
+    )
+
+    for window in args.windows:
+        write_queue = SaleWriteQueue(
+            app=app,
+            window=window,
+            max_batch_size=args.max_batch_size,
+        )
+        write_queue.start()
+        try:
+            latencies, elapsed = run(
+                lambda: write_queue.submit(sale()).result(),
+                args.concurrency,
+                args.sales,
+            )
+        finally:
+            write_queue.stop()
+
+        print(
+            f"{f'queue {window * 1000:g}ms':<16}{args.sales / elapsed:>10.0f}"
+            f"{write_queue.commits / elapsed:>11.0f}"
+            f"{write_queue.sales_written / write_queue.commits:>14.1f}"
+            f"{statistics.median(latencies) * 1000:>10.1f}"
+            f"{percentile(latencies, 99) * 1000:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
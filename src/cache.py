@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import collections
+import threading
+import time
+from typing import Any, Callable, Hashable, Optional
+
+
+class TTLCache:
+    """A thread safe, size bounded LRU cache whose entries expire.
+
+    Entries are evicted least recently used first once ``maxsize`` is
+    reached, and are treated as missing once they are older than ``ttl``
+    seconds.  A ``maxsize`` of ``0`` disables the cache entirely.
+
+    Parameters:
+        maxsize: Maximum number of entries to hold.
+        ttl: Number of seconds an entry stays valid after it is set.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: collections.OrderedDict[Hashable, tuple[float, Any]] = (
+            collections.OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        """Get a value from the cache, or ``default`` if missing or expired."""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+
+            expires_at, value = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Set a value in the cache, evicting the oldest entries if full."""
+        if self.maxsize <= 0:
+            return
+
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        """Remove a value from the cache and return it."""
+        with self._lock:
+            item = self._data.pop(key, None)
+
+        return default if item is None else item[1]
+
+    def evict(self, predicate: Callable[[Hashable, Any], bool]) -> int:
+        """Remove every entry whose key and value match ``predicate``.
+
+        Returns the number of entries removed.
+        """
+        with self._lock:
+            keys = [
+                key for key, (_, value) in self._data.items() if predicate(key, value)
+            ]
+            for key in keys:
+                del self._data[key]
+
+        return len(keys)
+
+    def clear(self) -> None:
+        """Remove every entry from the cache."""
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key) is not None
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import zlib
+from typing import Callable, Iterable, Iterator, Optional
+
+import flask
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Responses of these types are compressed, anything else, like images, is
+# sent as is.
+COMPRESSIBLE_MIMETYPES = frozenset(
+    [
+        "application/json",
+        "application/x-ndjson",
+        "application/vnd.mapbox-vector-tile",
+    ]
+)
+
+
+class _Gzip:
+    def __init__(self):
+        self._compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(
+            zlib.Z_SYNC_FLUSH
+        )
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class _Brotli:
+    def __init__(self):
+        # Quality 4 compresses better than gzip at a similar speed, the
+        # default of 11 is meant for static files.
+        self._compressor = brotli.Compressor(quality=4)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class _Zstd:
+    def __init__(self):
+        self._compressor = zstandard.ZstdCompressor(level=3).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(
+            zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        )
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+def _available_encoders() -> dict[str, Callable]:
+    """The encoders that can be used, most preferred first."""
+    encoders = {}
+    if zstandard is not None:
+        encoders["zstd"] = _Zstd
+    if brotli is not None:
+        encoders["br"] = _Brotli
+    encoders["gzip"] = _Gzip
+    return encoders
+
+
+def _compress_stream(chunks: Iterable, encoder) -> Iterator[bytes]:
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            # Every chunk is flushed, so streamed lines still reach the
+            # client as soon as they are written.
+            data = encoder.compress(chunk)
+            if data:
+                yield data
+        yield encoder.finish()
+    finally:
+        if hasattr(chunks, "close"):
+            chunks.close()
+
+
+def _should_compress(response: flask.Response) -> bool:
+    mimetype = response.mimetype or ""
+    return (
+        200 <= response.status_code < 300
+        and response.status_code != 204
+        and not response.direct_passthrough
+        and "Content-Encoding" not in response.headers
+        and (mimetype.startswith("text/") or mimetype in COMPRESSIBLE_MIMETYPES)
+    )
+
+
+def compress_response(response: flask.Response) -> flask.Response:
+    """Compress a response with the best encoding the client accepts.
+
+    zstd and brotli are used when their packages are installed, and
+    preferred over gzip when the client accepts them equally.  Bodies
+    smaller than ``COMPRESSION_MIN_SIZE`` bytes are sent as is, as
+    compressing them saves little.  Streamed responses are always
+    compressed, chunk by chunk.
+    """
+    if not _should_compress(response):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    encoders = _available_encoders()
+    encoding: Optional[str] = flask.request.accept_encodings.best_match(encoders)
+    if encoding is None:
+        return response
+
+    encoder = encoders[encoding]()
+    if response.is_streamed:
+        response.response = _compress_stream(response.response, encoder)
+        response.headers.pop("Content-Length", None)
+    else:
+        data = response.get_data()
+        if len(data) < flask.current_app.config["COMPRESSION_MIN_SIZE"]:
+            return response
+        response.set_data(encoder.compress(data) + encoder.finish())
+
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def init_app(app: flask.Flask) -> None:
+    """Compress the app's responses."""
+    app.after_request(compress_response)
@@ -1,3 +1,77 @@
 TOKEN_SCHEME = "Bearer"
 MAX_AGE_OF_REFRESH_TOKEN = 60 * 60 * 24 * 30  # 30 days
 MAX_AGE_OF_ACCESS_TOKEN = 60 * 30  # 30 minutes
+DEFAULT_ACCESS_TOKEN_CACHE_SIZE = 10_000
+# How long a validated access token is trusted without checking the database.
+# This bounds how long a revocation made by another worker goes unnoticed.
+DEFAULT_ACCESS_TOKEN_CACHE_TTL = 60  # 1 minute
+# How long role permissions are cached before they are reloaded.  This bounds
+# how long a change made outside this process, like by SQL or another worker,
+# goes unnoticed.
+DEFAULT_ROLE_PERMISSIONS_MAX_AGE = 60  # 1 minute
+DEFAULT_LAST_SEEN_FLUSH_INTERVAL = 5  # seconds
+DEFAULT_LAST_SEEN_BUFFER_SIZE = 1_000
+# Logins waiting for a free password hashing process before we shed load.
+DEFAULT_PASSWORD_HASH_QUEUE_DEPTH = 32
+# Login attempts allowed per second, and in a burst, for each ip address.
+DEFAULT_LOGIN_IP_THROTTLE_RATE = 1.0
+DEFAULT_LOGIN_IP_THROTTLE_BURST = 20
+# Failed login attempts allowed per second, and in a burst, for each email from
+# each ip address.
+DEFAULT_LOGIN_EMAIL_THROTTLE_RATE = 0.1
+DEFAULT_LOGIN_EMAIL_THROTTLE_BURST = 5
+DEFAULT_LOGIN_THROTTLE_MAX_KEYS = 100_000
+DEFAULT_TOKEN_JANITOR_INTERVAL = 60 * 60  # 1 hour, 0 disables the janitor
+# How long expired and revoked tokens are kept before they are deleted.
+DEFAULT_TOKEN_RETENTION = 60 * 60 * 24 * 7  # 7 days
+DEFAULT_TOKEN_JANITOR_BATCH_SIZE = 1_000
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1_000
+# Most recent sales embedded in each stand of a stand listing; the rest are
+# read from the paginated sales of the stand.
+EMBEDDED_STAND_SALES_LIMIT = 10
+# Rows fetched per round trip, and written per chunk, when streaming a response.
+STREAM_BATCH_SIZE = 1_000
+# Days of stats returned when no date range is asked for.
+DEFAULT_STATS_RANGE_IN_DAYS = 30
+# Sales accepted in one request to the batch sales endpoint.
+DEFAULT_SALES_BATCH_MAX_SIZE = 10_000
+# price_in_micros is stored in a 32 bit integer column.
+MAX_PRICE_IN_MICROS = 2**31 - 1
+# How long the sale write queue collects sales before committing them together.
+DEFAULT_SALE_WRITE_QUEUE_WINDOW = 0.01  # seconds
+DEFAULT_SALE_WRITE_QUEUE_MAX_BATCH_SIZE = 500
+# How long a request waits for its sale to be committed by the queue.
+DEFAULT_SALE_WRITE_QUEUE_TIMEOUT = 5  # seconds
+DEFAULT_NEAR_ME_RADIUS = 50_000  # metres
+MAX_NEAR_ME_RADIUS = 200_000  # metres
+DEFAULT_NEAR_ME_LIMIT = 5
+MAX_NEAR_ME_LIMIT = 100
+MAX_NEAR_ME_BATCH_POINTS = 100
+# Width and height in degrees of a cell of the in-memory stand index.
+DEFAULT_STAND_INDEX_CELL_SIZE = 0.1
+# Seconds before the in-memory stand index is rebuilt from the database.
+DEFAULT_STAND_INDEX_MAX_AGE = 5 * 60
+# The near-me cache is off unless a size is set, as stands changed by other
+# processes are only seen once their cells expire.
+DEFAULT_NEAR_ME_CACHE_SIZE = 0  # geohash cells, 0 disables the cache
+DEFAULT_NEAR_ME_CACHE_TTL = 30  # seconds
+# Geohash length of a near-me cache cell, 6 is about 1.2 km by 0.6 km.
+DEFAULT_NEAR_ME_CACHE_PRECISION = 6
+DEFAULT_NEAR_ME_CACHE_MAX_CANDIDATES = 1_000
+# Clusters across the width of a web map tile on the clustered stand map.
+MAP_CLUSTER_CELLS_PER_TILE = 16
+# Widest and tallest area, in web map tiles at its zoom level, the clustered
+# stand map is asked for, which bounds its clusters to 128 by 128.
+MAX_MAP_TILES_ACROSS = 8
+# Width of a cluster in vector tile units, of 4096 across a tile.
+TILE_CLUSTER_SIZE = 256
+MAX_TILE_ZOOM = 22
+# The stand tile cache is off unless a size is set, as stands changed by other
+# processes are only seen once their tiles expire.
+DEFAULT_STAND_TILE_CACHE_SIZE = 0  # tiles, 0 disables the cache
+DEFAULT_STAND_TILE_CACHE_TTL = 5 * 60  # seconds
+# How long clients may reuse a stand tile.
+TILE_CACHE_CONTROL_MAX_AGE = 30  # seconds
+# Smaller response bodies are not compressed.
+DEFAULT_COMPRESSION_MIN_SIZE = 1024  # bytes
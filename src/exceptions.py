@@ -28,3 +28,11 @@ class InvalidPermissionsError(Exception):
 
 class NotFound(Exception):
     pass
+
+
+class ServiceUnavailableError(Exception):
+    pass
+
+
+class TooManyRequestsError(Exception):
+    pass
@@ -0,0 +1,64 @@
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_BASE32_INDEX = {character: index for index, character in enumerate(_BASE32)}
+
+
+def encode(longitude: float, latitude: float, precision: int) -> str:
+    """Encode a point as a geohash of ``precision`` characters."""
+    west, east = -180.0, 180.0
+    south, north = -90.0, 90.0
+    characters = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(characters) < precision:
+        # Bits alternate between longitude and latitude, longitude first.
+        if even:
+            middle = (west + east) / 2
+            if longitude >= middle:
+                bits = bits << 1 | 1
+                west = middle
+            else:
+                bits <<= 1
+                east = middle
+        else:
+            middle = (south + north) / 2
+            if latitude >= middle:
+                bits = bits << 1 | 1
+                south = middle
+            else:
+                bits <<= 1
+                north = middle
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            characters.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+
+    return "".join(characters)
+
+
+def bounds(geohash: str) -> tuple[float, float, float, float]:
+    """Get the ``(west, south, east, north)`` bounds of a geohash cell."""
+    west, east = -180.0, 180.0
+    south, north = -90.0, 90.0
+    even = True
+    for character in geohash:
+        bits = _BASE32_INDEX[character]
+        for shift in range(4, -1, -1):
+            bit = bits >> shift & 1
+            if even:
+                middle = (west + east) / 2
+                if bit:
+                    west = middle
+                else:
+                    east = middle
+            else:
+                middle = (south + north) / 2
+                if bit:
+                    south = middle
+                else:
+                    north = middle
+            even = not even
+
+    return west, south, east, north
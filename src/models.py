@@ -5,9 +5,8 @@ import uuid
 from sqlalchemy.dialects.postgresql import UUID
 
 from flask_sqlalchemy import SQLAlchemy
-from geoalchemy2 import Geography, Geometry
-from geoalchemy2.shape import to_shape
-from sqlalchemy.orm import Mapped
+from geoalchemy2 import Geography
+from sqlalchemy.orm import Mapped, column_property
 
 # create the extension
 db = SQLAlchemy()
@@ -36,24 +35,42 @@ class User(db.Model):
 
 
 class AccessToken(db.Model):
+    __table_args__ = (
+        db.Index(
+            "ix_access_token_user_id_token_digest",
+            "user_id",
+            "token_digest",
+            unique=True,
+        ),
+        db.Index("ix_access_token_user_id_id", "user_id", "id"),
+    )
     id = db.Column(db.Integer, autoincrement=True, primary_key=True)
     user_id = db.Column(UUID(as_uuid=False), db.ForeignKey("user.id"), nullable=False)
     ip_address = db.Column(db.String(50), nullable=False)
     user_agent = db.Column(db.String(50), nullable=False)
-    token = db.Column(db.String(1000), nullable=False, unique=True)
-    expiration = db.Column(db.DateTime(timezone=True), nullable=False)
+    token = db.Column(db.String(1000), nullable=False)
+    token_digest = db.Column(db.LargeBinary(32), nullable=False)  # sha256 of token
+    expiration = db.Column(db.DateTime(timezone=True), nullable=False, index=True)
     created_at = db.Column(db.DateTime(timezone=True), nullable=False)
     last_seen_at = db.Column(db.DateTime(timezone=True), nullable=False)
 
 
 class RefreshToken(db.Model):
+    __table_args__ = (
+        db.Index(
+            "ix_refresh_token_user_id_token_digest",
+            "user_id",
+            "token_digest",
+            unique=True,
+        ),
+    )
     id = db.Column(db.Integer, autoincrement=True, primary_key=True)
     user_id = db.Column(UUID(as_uuid=False), db.ForeignKey("user.id"), nullable=False)
     ip_address = db.Column(db.String(50), nullable=False)
     user_agent = db.Column(db.String(50), nullable=False)
-    token = db.Column(db.String(1000), nullable=False, unique=True)
+    token_digest = db.Column(db.LargeBinary(32), nullable=False)  # sha256 of token
     revoked = db.Column(db.Boolean, nullable=False, default=False)
-    expiration = db.Column(db.DateTime(timezone=True), nullable=False)
+    expiration = db.Column(db.DateTime(timezone=True), nullable=False, index=True)
     created_at = db.Column(db.DateTime(timezone=True), nullable=False)
     last_used_at = db.Column(db.DateTime(timezone=True))
 
@@ -89,9 +106,16 @@ class Permission(db.Model):
 
 class LemonadeStand(db.Model):
     __tablename__ = "lemonade_stand"
+    __table_args__ = (db.Index("ix_lemonade_stand_owner_id_id", "owner_id", "id"),)
     id = db.Column(db.Integer, autoincrement=True, primary_key=True)
     name = db.Column(db.String(50), nullable=False, unique=True)
-    location = db.Column(Geometry("POINT"), nullable=False)
+    # POINT(longitude latitude), as geography so distances are in metres.
+    location = db.Column(
+        Geography("POINT", srid=4326, spatial_index=True), nullable=False
+    )
+    # Read the coordinates in the query, so responses never decode the WKB.
+    longitude = column_property(db.func.ST_X(db.func.geometry(location)))
+    latitude = column_property(db.func.ST_Y(db.func.geometry(location)))
     owner_id = db.Column(UUID(as_uuid=False), db.ForeignKey("user.id"), nullable=False)
     owner = db.relationship("User", backref="lemonade_stands", lazy=True)
     currency = db.Column(db.String(3), nullable=False, default="USD")
@@ -102,12 +126,28 @@ class LemonadeStand(db.Model):
     updated_at = db.Column(db.DateTime(timezone=True), nullable=False)
 
     def get_location(self) -> tuple[float, float]:
-        coords = to_shape(self.location).coords
-        return (coords[0][0], coords[0][1])
+        return (self.longitude, self.latitude)
+
+
+# Bounding box searches, like map tiles, compare longitudes and latitudes
+# instead of distances, so they use the location as a geometry.
+db.Index(
+    "ix_lemonade_stand_location_geometry",
+    db.func.geometry(LemonadeStand.location),
+    postgresql_using="gist",
+)
 
 
 class LemonadeStandSale(db.Model):
     __tablename__ = "lemonade_stand_sale"
+    __table_args__ = (
+        db.Index(
+            "ix_lemonade_stand_sale_lemonade_stand_id_date_id",
+            "lemonade_stand_id",
+            "date",
+            "id",
+        ),
+    )
     id = db.Column(db.Integer, autoincrement=True, primary_key=True)
     lemonade_stand_id = db.Column(
         db.Integer, db.ForeignKey("lemonade_stand.id"), nullable=False
@@ -118,3 +158,16 @@ class LemonadeStandSale(db.Model):
     date = db.Column(db.DateTime(timezone=True), nullable=False)
     currency = db.Column(db.String(3), nullable=False)
     price_in_micros = db.Column(db.Integer, nullable=False)  # normal price * 1,000
+
+
+class LemonadeStandDailySales(db.Model):
+    """Sales of a stand per UTC day and currency, kept up to date as sales are made."""
+
+    __tablename__ = "lemonade_stand_daily_sales"
+    lemonade_stand_id = db.Column(
+        db.Integer, db.ForeignKey("lemonade_stand.id"), primary_key=True
+    )
+    day = db.Column(db.Date, primary_key=True)
+    currency = db.Column(db.String(3), primary_key=True)
+    sales_count = db.Column(db.Integer, nullable=False)
+    revenue_in_micros = db.Column(db.BigInteger, nullable=False)
@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import base64
+import binascii
+import datetime
+import json
+from typing import Any, NamedTuple, Optional, Sequence
+
+import flask
+import sqlalchemy
+
+import constants
+from exceptions import UnprocessableEntityError
+from responses import json_response
+
+
+class PageRequest(NamedTuple):
+    """Which page of a listing to return.
+
+    ``cursor`` holds the sort key values of the last item of the previous
+    page, or ``None`` for the first page.
+    """
+
+    cursor: Optional[list[Any]]
+    limit: int
+
+
+class Page(NamedTuple):
+    items: list[Any]
+    next_cursor: Optional[str]
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encode sort key values as an opaque cursor."""
+    data = json.dumps(
+        [
+            value.isoformat() if isinstance(value, datetime.datetime) else value
+            for value in values
+        ],
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(data.encode()).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> list[Any]:
+    """Decode an opaque cursor into sort key values.
+
+    Raises:
+        UnprocessableEntityError: If the cursor is malformed.
+    """
+    try:
+        data = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(data)
+    except (binascii.Error, ValueError):
+        raise UnprocessableEntityError()
+
+    if not isinstance(values, list):
+        raise UnprocessableEntityError()
+
+    return values
+
+
+def get_page_request() -> PageRequest:
+    """Get the page requested with the ``cursor`` and ``limit`` query parameters.
+
+    ``limit`` defaults to ``DEFAULT_PAGE_SIZE`` and is capped at ``MAX_PAGE_SIZE``.
+
+    Raises:
+        UnprocessableEntityError: If the cursor or limit are malformed.
+    """
+    try:
+        limit = int(flask.request.args.get("limit", constants.DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise UnprocessableEntityError()
+
+    if limit < 1:
+        raise UnprocessableEntityError()
+
+    cursor = flask.request.args.get("cursor")
+    return PageRequest(
+        cursor=decode_cursor(cursor) if cursor else None,
+        limit=min(limit, constants.MAX_PAGE_SIZE),
+    )
+
+
+def _from_cursor_value(column: sqlalchemy.Column, value: Any) -> Any:
+    python_type = column.type.python_type
+    try:
+        if python_type is datetime.datetime:
+            return datetime.datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise UnprocessableEntityError()
+
+    # bool is an int, but never a valid sort key.
+    if not isinstance(value, python_type) or isinstance(value, bool):
+        raise UnprocessableEntityError()
+
+    return value
+
+
+def paginate(
+    query: Any,
+    page_request: PageRequest,
+    order_by: Sequence[sqlalchemy.Column],
+    descending: bool = False,
+) -> Page:
+    """Get one page of a query using keyset pagination.
+
+    Rows are ordered by ``order_by``, which must be unique together, and
+    the page starts after the cursor's sort key values.  The database can
+    seek straight to the cursor with an index on ``order_by``, so every
+    page costs the same however deep into the listing it is.
+
+    Parameters:
+        query: The query to paginate.
+        page_request: The requested page.
+        order_by: Columns to sort by, the last being a unique tie breaker.
+        descending: Whether to return the largest sort keys first.
+
+    Raises:
+        UnprocessableEntityError: If the cursor does not match ``order_by``.
+    """
+    if page_request.cursor is not None:
+        if len(page_request.cursor) != len(order_by):
+            raise UnprocessableEntityError()
+
+        cursor_values = [
+            _from_cursor_value(column, value)
+            for column, value in zip(order_by, page_request.cursor)
+        ]
+        keys = sqlalchemy.tuple_(*order_by)
+        cursor = sqlalchemy.tuple_(*cursor_values)
+        query = query.filter(keys < cursor if descending else keys > cursor)
+
+    query = query.order_by(
+        *(column.desc() if descending else column.asc() for column in order_by)
+    )
+    # Fetch one extra row to find out if there is another page.
+    rows = query.limit(page_request.limit + 1).all()
+    items = rows[: page_request.limit]
+
+    next_cursor = None
+    if len(rows) > page_request.limit:
+        last = items[-1]
+        next_cursor = encode_cursor([getattr(last, column.key) for column in order_by])
+
+    return Page(items=items, next_cursor=next_cursor)
+
+
+def page_response(
+    page: Page,
+    body: Any,
+    type_: Any = None,
+    *,
+    from_attributes: bool = False,
+) -> flask.Response:
+    """Make a JSON response for a page, linking to the next page if there is one.
+
+    Parameters:
+        page: The page being returned.
+        body: The body of the response, serialized with
+            ``responses.dump_json``.
+        type_: The type of ``body``, like ``list[StandResponse]``.
+        from_attributes: Read ``body`` into ``type_`` by attributes, for
+            example from the ORM objects of ``page.items``.
+    """
+    response = json_response(body, type_, from_attributes=from_attributes)
+    if page.next_cursor is not None:
+        next_url = flask.url_for(
+            flask.request.endpoint,
+            **(flask.request.view_args or {}),
+            cursor=page.next_cursor,
+            limit=flask.request.args.get("limit", constants.DEFAULT_PAGE_SIZE),
+        )
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+
+    return response
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import functools
+from typing import Any, Iterable
+
+import flask
+import flask.json.provider
+import pydantic
+
+import constants
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+NDJSON_MIMETYPE = "application/x-ndjson"
+
+
+@functools.cache
+def _type_adapter(type_: Any) -> pydantic.TypeAdapter:
+    # Building a TypeAdapter compiles a validator and serializer, so each
+    # type is only built once.
+    return pydantic.TypeAdapter(type_)
+
+
+def dump_json(
+    value: Any,
+    type_: Any = None,
+    *,
+    from_attributes: bool = False,
+    exclude_none: bool = False,
+) -> bytes:
+    """Serialize a value straight to JSON bytes, with field aliases.
+
+    Parameters:
+        value: The value to serialize, for example a response model or a
+            list of them.
+        type_: The type of ``value``, like ``list[StandResponse]``.
+            Defaults to the type of ``value``.
+        from_attributes: Validate ``value`` into ``type_`` first, reading
+            fields from attributes, for example of ORM objects.
+        exclude_none: Leave out fields that are ``None``.
+    """
+    adapter = _type_adapter(type(value) if type_ is None else type_)
+    if from_attributes:
+        value = adapter.validate_python(value, from_attributes=True)
+    return adapter.dump_json(value, by_alias=True, exclude_none=exclude_none)
+
+
+def json_response(
+    value: Any,
+    type_: Any = None,
+    *,
+    status: int = 200,
+    from_attributes: bool = False,
+    exclude_none: bool = False,
+) -> flask.Response:
+    """Make a JSON response, serialized with ``dump_json``."""
+    return flask.current_app.response_class(
+        dump_json(
+            value,
+            type_,
+            from_attributes=from_attributes,
+            exclude_none=exclude_none,
+        ),
+        status=status,
+        mimetype="application/json",
+    )
+
+
+class OrjsonProvider(flask.json.provider.DefaultJSONProvider):
+    """Encode ``flask.jsonify`` responses with orjson.
+
+    Types orjson does not encode the same way, like datetimes, fall back
+    to the default provider, so responses look the same but are faster.
+    """
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        # Compact output is all orjson writes, indented debug output and
+        # other options are left to the json module.
+        if kwargs and kwargs != {"separators": (",", ":")}:
+            return super().dumps(obj, **kwargs)
+
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+
+
+def init_app(app: flask.Flask) -> None:
+    """Use orjson for ``flask.jsonify`` when it is installed."""
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
+
+
+def wants_ndjson() -> bool:
+    """Check if the client prefers newline delimited JSON over a JSON array."""
+    best_match = flask.request.accept_mimetypes.best_match(
+        ["application/json", NDJSON_MIMETYPE]
+    )
+    return best_match == NDJSON_MIMETYPE
+
+
+def ndjson_response(
+    items: Iterable[Any],
+    type_: Any,
+) -> flask.Response:
+    """Stream items as newline delimited JSON, one item per line.
+
+    Items are consumed lazily while the response is written, in chunks of
+    ``STREAM_BATCH_SIZE`` lines, so memory use does not grow with the
+    number of items and the first bytes are sent straight away.
+
+    Parameters:
+        items: The items to send, for example a query using ``yield_per``.
+        type_: The response model each item is read into, by attributes.
+    """
+
+    def generate():
+        lines = []
+        for item in items:
+            lines.append(dump_json(item, type_, from_attributes=True))
+            if len(lines) >= constants.STREAM_BATCH_SIZE:
+                yield b"\n".join(lines) + b"\n"
+                lines = []
+
+        if lines:
+            yield b"\n".join(lines) + b"\n"
+
+    return flask.Response(
+        flask.stream_with_context(generate()),
+        mimetype=NDJSON_MIMETYPE,
+    )
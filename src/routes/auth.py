@@ -1,16 +1,15 @@
 from __future__ import annotations
 
-import datetime
-import random
-import time
-
 import flask
 import sqlalchemy
 
 import services.auth
+import services.password
+import services.throttle
 import services.user
 from exceptions import InvalidCredentialsError, UnprocessableEntityError
 from models import db
+from responses import json_response
 from serialization import LoginRequest, RefreshTokenRequest
 
 auth_blueprint = flask.Blueprint("auth", __name__)
@@ -27,11 +26,20 @@ def login():
         case _:
             raise UnprocessableEntityError()
 
-    user = services.user.get_user_by_email(email=login_request.email.lower())
+    email = login_request.email.lower()
+    ip_address = flask.request.remote_addr or ""
+    services.throttle.throttle_login(ip_address=ip_address, email=email)
+
+    user = services.user.get_user_by_email(email=email)
 
     if user is None:
-        # Simulate a slow response to prevent timing attacks
-        time.sleep(random.uniform(0.1, 0.3))
+        # Check against a dummy hash so unknown emails take as long as wrong
+        # passwords, preventing timing attacks.
+        services.auth.check_password_hash(
+            password_hash=services.password.get_dummy_password_hash(),
+            password_plain_text=login_request.password,
+        )
+        services.throttle.record_failed_login(ip_address=ip_address, email=email)
         raise InvalidCredentialsError()
 
     if services.auth.check_password_hash(
@@ -41,8 +49,9 @@ def login():
         token_pair = services.auth.create_token_pair_for_user(user)
         db.session.commit()
 
-        return flask.jsonify(token_pair.model_dump(by_alias=True)), 201
+        return json_response(token_pair, status=201)
     else:
+        services.throttle.record_failed_login(ip_address=ip_address, email=email)
         raise InvalidCredentialsError()
 
 
@@ -59,7 +68,14 @@ def revoke():
         case _:
             raise UnprocessableEntityError()
 
-    services.auth.invalidate_refresh_token(token=refresh_token_request.refresh_token)
+    services.auth.invalidate_refresh_token(
+        user_id=flask.g.user.id,
+        token=refresh_token_request.refresh_token,
+    )
+    services.auth.revoke_access_token(
+        raw_access_token=services.auth.get_raw_access_token_from_request_headers(),
+        token_claims=flask.g.token_claims,
+    )
     try:
         db.session.commit()
     except sqlalchemy.exc.IntegrityError:
@@ -84,20 +100,15 @@ def refresh_token():
     refresh_claims = services.auth.decode_jwt_refresh_token(
         refresh_token_request.refresh_token
     )
-    existing_refresh_token = services.auth.get_existing_refresh_token_for_user(
+    # Revoking the old token and creating the new pair share one transaction,
+    # so only one of several concurrent refreshes with a token can succeed.
+    if not services.auth.revoke_refresh_token(
         user_id=refresh_claims.sub,
         refresh_token=refresh_token_request.refresh_token,
-    )
-
-    if existing_refresh_token is None:
+    ):
         raise InvalidCredentialsError()
 
-    existing_refresh_token.last_used_at = datetime.datetime.now(
-        tz=datetime.timezone.utc
-    )
-    existing_refresh_token.revoked = True
-
-    user = services.user.get_user_by_id(id=existing_refresh_token.user_id)
+    user = services.user.get_user_by_id(id=refresh_claims.sub)
     if user is None:
         raise InvalidCredentialsError()
 
@@ -109,4 +120,4 @@ def refresh_token():
         db.session.rollback()
         flask.abort(400)
 
-    return flask.jsonify(token_pair.model_dump(by_alias=True)), 201
+    return json_response(token_pair, status=201)
@@ -9,7 +9,9 @@ from exceptions import (
     InvalidCredentialsError,
     InvalidPermissionsError,
     ServerError,
+    ServiceUnavailableError,
     StandAlreadyExistsError,
+    TooManyRequestsError,
     UnprocessableEntityError,
     UserAlreadyExistsError,
 )
@@ -35,6 +37,18 @@ def handle_error(error):
             return flask.jsonify({"error": "Invalid username or password."}), 401
         case ServerError():
             return flask.jsonify({"error": "Internal server error."}), 500
+        case TooManyRequestsError():
+            return (
+                flask.jsonify({"error": "Too many requests, try again later."}),
+                429,
+                {"Retry-After": "60"},
+            )
+        case ServiceUnavailableError():
+            return (
+                flask.jsonify({"error": "Service unavailable, try again later."}),
+                503,
+                {"Retry-After": "1"},
+            )
         case ExpiredTokenError():
             return flask.jsonify({"error": "Token has expired."}), 401
         case InvalidPermissionsError():
@@ -1,6 +1,7 @@
 import flask
 
 from models import Permission, Role
+from responses import json_response
 from serialization import PermissionResponse, RoleResponse
 
 roles_blueprint = flask.Blueprint("roles", __name__)
@@ -8,15 +9,11 @@ roles_blueprint = flask.Blueprint("roles", __name__)
 
 @roles_blueprint.route("/roles", methods=["GET"])
 def get_all_roles():
-    return flask.jsonify(
-        RoleResponse.model_validate(role).model_dump(by_alias=True)
-        for role in Role.query.all()
-    )
+    return json_response(Role.query.all(), list[RoleResponse], from_attributes=True)
 
 
 @roles_blueprint.route("/permissions", methods=["GET"])
 def get_all_permissions():
-    return flask.jsonify(
-        PermissionResponse.model_validate(permission).model_dump(by_alias=True)
-        for permission in Permission.query.all()
+    return json_response(
+        Permission.query.all(), list[PermissionResponse], from_attributes=True
     )
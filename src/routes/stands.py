@@ -1,61 +1,66 @@
+import concurrent.futures
 import datetime
 import logging
 
 import flask
+import pydantic
 import sqlalchemy
-from sqlalchemy.sql import func
 
+import constants
 import services.auth
+import services.sale_writer
 import services.stand
-from exceptions import NotFound, StandAlreadyExistsError, UnprocessableEntityError
-from models import LemonadeStand, LemonadeStandSale, db
+import services.stand_map
+import services.stand_search
+import services.stats
+from exceptions import (
+    NotFound,
+    ServiceUnavailableError,
+    StandAlreadyExistsError,
+    UnprocessableEntityError,
+)
+from models import LemonadeStand, db
+from pagination import get_page_request, page_response
+from responses import json_response, ndjson_response, wants_ndjson
 from serialization import (
+    BatchSaleRequest,
+    BatchSaleResponse,
+    BatchSaleResult,
     CreateStandRequest,
     LemonadeSaleResponse,
+    NearbyStandResponse,
+    NearMeBatchRequest,
     SellLemonadeRequest,
+    StandClusterResponse,
     StandResponse,
+    StandStatsResponse,
 )
 
 logger = logging.getLogger(__name__)
 stands_blueprint = flask.Blueprint("stands", __name__)
 
 
-def stand_orm_to_response(stand_orm: LemonadeStand) -> StandResponse:
-    return StandResponse(
-        id=stand_orm.id,
-        owner_id=stand_orm.owner_id,
-        name=stand_orm.name,
-        location=stand_orm.get_location(),
-        created_at=stand_orm.created_at,
-        updated_at=stand_orm.updated_at,
-        current_price_in_micros=stand_orm.current_price_in_micros,
-        currency=stand_orm.currency,
-        sales=stand_orm.sales,
-    )
-
-
 @stands_blueprint.route("/my/stands", methods=["GET"])
 @services.auth.auth_required(permissions=["lemonade-stand.my.stands.get"])
 def get_my_stands():
-    stands = services.stand.get_owners_lemonade_stands(owner_id=flask.g.user.id)
-    return flask.jsonify(
-        stand_orm_to_response(stand).model_dump(by_alias=True) for stand in stands
+    page = services.stand.get_owners_lemonade_stands(
+        owner_id=flask.g.user.id,
+        page_request=get_page_request(),
     )
+    return page_response(page, page.items, list[StandResponse], from_attributes=True)
 
 
 @stands_blueprint.route("/my/stands/<int:stand_id>", methods=["GET"])
 @services.auth.auth_required(permissions=["lemonade-stand.my.stands.get"])
 def get_my_stand(stand_id: int):
-    stand = services.stand.get_owners_lemonade_stand_by_id(
+    stand = services.stand.get_owners_lemonade_stand_row(
         owner_id=flask.g.user.id,
         stand_id=stand_id,
     )
     if stand is None:
         raise NotFound()
 
-    r = stand_orm_to_response(stand).model_dump(by_alias=True)
-
-    return flask.jsonify(r)
+    return json_response(stand, StandResponse, from_attributes=True)
 
 
 @stands_blueprint.route("/my/stands/<int:stand_id>/sales", methods=["POST"])
@@ -78,14 +83,69 @@ def sell_lemonade(stand_id: int):
             raise UnprocessableEntityError()
 
     now = datetime.datetime.now(tz=datetime.timezone.utc)
-    sale = LemonadeStandSale(
-        lemonade_stand=stand,
+    sale = dict(
+        lemonade_stand_id=stand.id,
         currency=stand.currency,
         price_in_micros=sell_lemonade_request.price_in_micros,
         date=now,
     )
 
-    db.session.add(sale)
+    sale_write_queue = services.sale_writer.get_sale_write_queue()
+    try:
+        if sale_write_queue is not None:
+            # Give the request's connection back to the pool first, as the
+            # queue writes on a connection of its own.
+            db.session.commit()
+            # Committed together with the sales of other requests.
+            sale_write_queue.submit(sale).result(
+                timeout=flask.current_app.config["SALE_WRITE_QUEUE_TIMEOUT"]
+            )
+        else:
+            services.stand.insert_lemonade_stand_sales([sale])
+            db.session.commit()
+    except sqlalchemy.exc.IntegrityError:
+        db.session.rollback()
+        flask.abort(400)
+    except concurrent.futures.TimeoutError:
+        # The sale may still be written once the queue catches up.
+        raise ServiceUnavailableError()
+
+    return "", 201
+
+
+@stands_blueprint.route("/my/stands/<int:stand_id>/sales/batch", methods=["POST"])
+@services.auth.auth_required(permissions=["lemonade-stand.my.stands.sales.create"])
+def sell_lemonade_batch(stand_id: int):
+    data = flask.request.get_json()
+    match data:
+        case list() if len(data) <= flask.current_app.config["SALES_BATCH_MAX_SIZE"]:
+            pass
+        case _:
+            raise UnprocessableEntityError()
+
+    stand = services.stand.get_owners_lemonade_stand_by_id(
+        owner_id=flask.g.user.id, stand_id=stand_id
+    )
+    if stand is None:
+        raise NotFound()
+
+    sales = []
+    results = []
+    for index, item in enumerate(data):
+        try:
+            sales.append(BatchSaleRequest.model_validate(item))
+        except pydantic.ValidationError as e:
+            results.append(
+                BatchSaleResult(
+                    index=index,
+                    status=400,
+                    errors=e.errors(include_url=False, include_context=False),
+                )
+            )
+        else:
+            results.append(BatchSaleResult(index=index, status=201))
+
+    services.stand.add_lemonade_stand_sales(stand, sales)
 
     try:
         db.session.commit()
@@ -93,7 +153,12 @@ def sell_lemonade(stand_id: int):
         db.session.rollback()
         flask.abort(400)
 
-    return "", 201
+    response = BatchSaleResponse(created=len(sales), results=results)
+    return json_response(
+        response,
+        exclude_none=True,
+        status=201 if len(sales) == len(data) else 207,
+    )
 
 
 @stands_blueprint.route("/my/stands/<int:stand_id>/sales", methods=["GET"])
@@ -106,23 +171,102 @@ def get_my_stand_sales(stand_id: int):
     if stand is None:
         raise NotFound()
 
-    return flask.jsonify(
-        LemonadeSaleResponse.model_validate(sale).model_dump(by_alias=True)
-        for sale in stand.sales
+    if wants_ndjson():
+        return ndjson_response(
+            services.stand.stream_lemonade_stand_sales(stand_id=stand.id),
+            LemonadeSaleResponse,
+        )
+
+    page = services.stand.get_lemonade_stand_sales(
+        stand_id=stand.id,
+        page_request=get_page_request(),
+    )
+    return page_response(
+        page, page.items, list[LemonadeSaleResponse], from_attributes=True
+    )
+
+
+def _get_day_arg(name: str, default: datetime.date) -> datetime.date:
+    value = flask.request.args.get(name)
+    if value is None:
+        return default
+
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise UnprocessableEntityError()
+
+
+@stands_blueprint.route("/my/stands/<int:stand_id>/stats", methods=["GET"])
+@services.auth.auth_required(permissions=["lemonade-stand.my.stands.stats.get"])
+def get_my_stand_stats(stand_id: int):
+    stand = services.stand.get_owners_lemonade_stand_by_id(
+        owner_id=flask.g.user.id,
+        stand_id=stand_id,
+    )
+    if stand is None:
+        raise NotFound()
+
+    today = datetime.datetime.now(tz=datetime.timezone.utc).date()
+    end_day = _get_day_arg("to", default=today)
+    start_day = _get_day_arg(
+        "from",
+        default=end_day
+        - datetime.timedelta(days=constants.DEFAULT_STATS_RANGE_IN_DAYS - 1),
+    )
+    if start_day > end_day:
+        raise UnprocessableEntityError()
+
+    daily_sales = services.stats.get_daily_sales(
+        stand_id=stand.id,
+        start_day=start_day,
+        end_day=end_day,
+    )
+    stats = StandStatsResponse(
+        start_day=start_day,
+        end_day=end_day,
+        days=daily_sales,
+        totals=services.stats.get_sales_totals(daily_sales),
+    )
+
+    return json_response(stats)
+
+
+@stands_blueprint.route("/my/stands/<int:stand_id>/stats", methods=["POST"])
+@services.auth.auth_required(permissions=["lemonade-stand.my.stands.stats.create"])
+def rebuild_my_stand_stats(stand_id: int):
+    stand = services.stand.get_owners_lemonade_stand_by_id(
+        owner_id=flask.g.user.id,
+        stand_id=stand_id,
+    )
+    if stand is None:
+        raise NotFound()
+
+    services.stats.rebuild_daily_sales(stand_id=stand.id)
+    db.session.commit()
+
+    return (
+        "",
+        201,
+        {"Location": flask.url_for("stands.get_my_stand_stats", stand_id=stand.id)},
     )
 
 
 @stands_blueprint.route("/my/sales", methods=["GET"])
 @services.auth.auth_required(permissions=["lemonade-stand.my.stands.sales.get"])
 def get_my_sales():
-    stands = services.stand.get_owners_lemonade_stands(owner_id=flask.g.user.id)
-    stand_ids = [stand.id for stand in stands]
-
-    sales = services.stand.get_lemonade_stand_sales_by_ids(stand_ids)
+    if wants_ndjson():
+        return ndjson_response(
+            services.stand.stream_owners_lemonade_stand_sales(owner_id=flask.g.user.id),
+            LemonadeSaleResponse,
+        )
 
-    return flask.jsonify(
-        LemonadeSaleResponse.model_validate(sale).model_dump(by_alias=True)
-        for sale in sales
+    page = services.stand.get_owners_lemonade_stand_sales(
+        owner_id=flask.g.user.id,
+        page_request=get_page_request(),
+    )
+    return page_response(
+        page, page.items, list[LemonadeSaleResponse], from_attributes=True
     )
 
 
@@ -163,45 +307,103 @@ def create_my_stand():
     )
 
 
+def _get_number_arg(
+    name: str,
+    type_: type[int] | type[float],
+    minimum: float,
+    maximum: float,
+    default: int | float | None = None,
+) -> int | float:
+    value = flask.request.args.get(name)
+    if value is None:
+        if default is None:
+            raise UnprocessableEntityError()
+        return default
+
+    try:
+        number = type_(value)
+    except ValueError:
+        raise UnprocessableEntityError()
+
+    # NaN fails every comparison, so it is rejected too.
+    if not minimum <= number <= maximum:
+        raise UnprocessableEntityError()
+
+    return number
+
+
 @stands_blueprint.route("/stands/near-me", methods=["GET"])
 def get_stands_near_me():
-    try:
-        longitude = flask.request.args.get("longitude")
-        latitude = flask.request.args.get("latitude")
-        if not longitude and not latitude:
-            raise UnprocessableEntityError()
+    stands = services.stand.get_lemonade_stands_near(
+        longitude=_get_number_arg("longitude", float, -180, 180),
+        latitude=_get_number_arg("latitude", float, -90, 90),
+        radius=_get_number_arg(
+            "radius",
+            float,
+            0,
+            constants.MAX_NEAR_ME_RADIUS,
+            default=constants.DEFAULT_NEAR_ME_RADIUS,
+        ),
+        limit=_get_number_arg(
+            "limit",
+            int,
+            1,
+            constants.MAX_NEAR_ME_LIMIT,
+            default=constants.DEFAULT_NEAR_ME_LIMIT,
+        ),
+    )
 
-        longitude = float(longitude)
-        latitude = float(latitude)
-
-        stands = (
-            db.session.query(
-                LemonadeStand.name,
-                LemonadeStand.current_price_in_micros,
-                func.ST_DistanceSphere(
-                    LemonadeStand.location,
-                    func.ST_GeomFromText(f"POINT({longitude} {latitude})"),
-                ).label("distance"),
-            )
-            .filter(
-                func.ST_DWithin(
-                    LemonadeStand.location,
-                    func.ST_GeomFromText(f"POINT({longitude} {latitude})"),
-                    50000,  # 50km
-                )
-            )
-            .limit(5)
-            .all()
-        )
-    except Exception as e:
-        logger.exception("Failed to get stands near me")
-        raise Exception("Failed to get stands near me") from e
-
-    return flask.jsonify(
-        dict(
-            name=stand.name,
-            currentPriceInMicros=stand.current_price_in_micros,
-            distance=stand.distance,
-        )
-        for stand in stands
+    return json_response(stands, list[NearbyStandResponse], from_attributes=True)
+
+
+@stands_blueprint.route("/stands/near-me/batch", methods=["POST"])
+def get_stands_near_points():
+    data = NearMeBatchRequest.model_validate(flask.request.get_json())
+    stands = services.stand_search.find_lemonade_stands_near_points(
+        points=[(point.longitude, point.latitude) for point in data.points],
+        radius=data.radius,
+        limit=data.limit,
+    )
+
+    return json_response(stands, list[list[NearbyStandResponse]], from_attributes=True)
+
+
+@stands_blueprint.route("/stands/map", methods=["GET"])
+def get_stands_map():
+    west = _get_number_arg("west", float, -180, 180)
+    south = _get_number_arg("south", float, -90, 90)
+    east = _get_number_arg("east", float, -180, 180)
+    north = _get_number_arg("north", float, -90, 90)
+    zoom = _get_number_arg("zoom", int, 0, constants.MAX_TILE_ZOOM)
+    if west >= east or south >= north:
+        raise UnprocessableEntityError()
+    # The number of clusters grows with the area over the square of a tile.
+    max_size = 360 / 2**zoom * constants.MAX_MAP_TILES_ACROSS
+    if east - west > max_size or north - south > max_size:
+        raise UnprocessableEntityError()
+
+    clusters = services.stand_map.get_stand_clusters(
+        west=west, south=south, east=east, north=north, zoom=zoom
+    )
+
+    # Larger clusters have no stand fields, which are left out.
+    return json_response(
+        clusters,
+        list[StandClusterResponse],
+        from_attributes=True,
+        exclude_none=True,
+    )
+
+
+@stands_blueprint.route("/stands/tiles/<int:z>/<int:x>/<int:y>.mvt", methods=["GET"])
+def get_stands_tile(z: int, x: int, y: int):
+    if z > constants.MAX_TILE_ZOOM or x >= 2**z or y >= 2**z:
+        raise NotFound()
+
+    return flask.Response(
+        services.stand_map.get_stand_tile(z, x, y),
+        mimetype=services.stand_map.TILE_MIMETYPE,
+        headers={
+            "Cache-Control": f"public, max-age={constants.TILE_CACHE_CONTROL_MAX_AGE}"
+        },
     )
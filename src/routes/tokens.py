@@ -1,6 +1,7 @@
 import flask
 
 import services.auth
+from pagination import get_page_request, page_response
 from serialization import AccessTokenResponse
 
 tokens_blueprint = flask.Blueprint("tokens", __name__)
@@ -9,8 +10,10 @@ tokens_blueprint = flask.Blueprint("tokens", __name__)
 @tokens_blueprint.route("/my/tokens", methods=["GET"])
 @services.auth.auth_required(permissions=["lemonade-stand.my.tokens.get"])
 def get_all_tokens():
-    tokens = services.auth.get_all_access_tokens_for_user(user_id=flask.g.user.id)
-    return flask.jsonify(
-        AccessTokenResponse.model_validate(token).model_dump(by_alias=True)
-        for token in tokens
+    page = services.auth.get_all_access_tokens_for_user(
+        user_id=flask.g.user.id,
+        page_request=get_page_request(),
+    )
+    return page_response(
+        page, page.items, list[AccessTokenResponse], from_attributes=True
     )
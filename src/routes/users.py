@@ -7,6 +7,8 @@ import services.auth
 import services.user
 from exceptions import UnprocessableEntityError, UserAlreadyExistsError
 from models import db
+from pagination import get_page_request, page_response
+from responses import json_response
 from serialization import CreateUserRequest, GetUserResponse
 
 users_blueprint = flask.Blueprint("users", __name__)
@@ -15,9 +17,8 @@ users_blueprint = flask.Blueprint("users", __name__)
 @users_blueprint.route("/users", methods=["GET"])
 @services.auth.auth_required(permissions=["lemonade-stand.admin.users.get"])
 def get_all_users():
-    users = services.user.get_all_users()
-    users_data = [GetUserResponse.model_validate(user) for user in users]
-    return flask.jsonify(user.model_dump_json(by_alias=True) for user in users_data)
+    page = services.user.get_all_users(page_request=get_page_request())
+    return page_response(page, page.items, list[GetUserResponse], from_attributes=True)
 
 
 @users_blueprint.route("/users/<int:id>", methods=["GET"])
@@ -33,7 +34,7 @@ def get_user(id: int):
         age=user.age,
     )
 
-    return flask.jsonify(user_data.model_dump(by_alias=True))
+    return json_response(user_data)
 
 
 @users_blueprint.route("/users", methods=["POST"])
@@ -67,6 +68,4 @@ def create_user():
 @users_blueprint.route("/users/me", methods=["GET"])
 @services.auth.auth_required(permissions=["lemonade-stand.me.get"])
 def get_me():
-    return flask.jsonify(
-        GetUserResponse.model_validate(flask.g.user).model_dump(by_alias=True)
-    )
+    return json_response(flask.g.user, GetUserResponse, from_attributes=True)
@@ -1,9 +1,15 @@
 from __future__ import annotations
 
 import datetime
+from typing import Annotated
 
 import pydantic
 
+import constants
+
+Longitude = Annotated[float, pydantic.Field(ge=-180, le=180, allow_inf_nan=False)]
+Latitude = Annotated[float, pydantic.Field(ge=-90, le=90, allow_inf_nan=False)]
+
 
 def to_camel(string: str) -> str:
     parts = string.split("_")
@@ -56,7 +62,11 @@ class JWTRefreshTokenClaims(pydantic.BaseModel):
 
 
 class JWTAccessTokenClaims(JWTRefreshTokenClaims):
-    roles: list[str]
+    # Permissions are either listed by name in ``roles``, or given as a
+    # compact bitset in ``perms`` for the registry version ``perms_version``.
+    roles: list[str] | None = None
+    perms: str | None = None
+    perms_version: str | None = None
 
 
 class TokenPair(JsonBase):
@@ -107,7 +117,7 @@ StandResponse.model_rebuild()
 
 class CreateStandRequest(JsonBase):
     name: str
-    location: tuple[float, float]
+    location: tuple[Longitude, Latitude]
     currency: str
     current_price_in_micros: int
 
@@ -140,11 +150,100 @@ class RoleResponse(JsonBase):
 RoleResponse.model_rebuild()
 
 
+class Principal(JsonBase):
+    """The authenticated user of a request, available as ``flask.g.user``."""
+
+    id: str
+    email: str
+    first_name: str
+    last_name: str
+    age: int
+    roles: list[RoleRelationship]
+
+
+Principal.model_rebuild()
+
+
 class SellLemonadeRequest(JsonBase):
     price_in_micros: int
 
 
+class BatchSaleRequest(JsonBase):
+    price_in_micros: int = pydantic.Field(ge=0, le=constants.MAX_PRICE_IN_MICROS)
+    date: pydantic.AwareDatetime
+
+
+class BatchSaleResult(JsonBase):
+    index: int
+    status: int
+    errors: list[dict] | None = None
+
+
+class BatchSaleResponse(JsonBase):
+    created: int
+    results: list[BatchSaleResult]
+
+
+class NearMePoint(JsonBase):
+    longitude: Longitude
+    latitude: Latitude
+
+
+class NearMeBatchRequest(JsonBase):
+    points: list[NearMePoint] = pydantic.Field(
+        min_length=1, max_length=constants.MAX_NEAR_ME_BATCH_POINTS
+    )
+    radius: float = pydantic.Field(
+        default=constants.DEFAULT_NEAR_ME_RADIUS,
+        ge=0,
+        le=constants.MAX_NEAR_ME_RADIUS,
+    )
+    limit: int = pydantic.Field(
+        default=constants.DEFAULT_NEAR_ME_LIMIT,
+        ge=1,
+        le=constants.MAX_NEAR_ME_LIMIT,
+    )
+
+
+class NearbyStandResponse(JsonBase):
+    id: int
+    name: str
+    current_price_in_micros: int
+    distance: float
+
+
+class StandClusterResponse(JsonBase):
+    longitude: float
+    latitude: float
+    count: int
+    # Only set for a cluster of one stand.
+    id: int | None = None
+    name: str | None = None
+    current_price_in_micros: int | None = None
+    currency: str | None = None
+
+
 class LemonadeSaleResponse(JsonBase):
     date: datetime.datetime
     currency: str
     price_in_micros: int
+
+
+class DailySalesResponse(JsonBase):
+    day: datetime.date
+    currency: str
+    sales_count: int
+    revenue_in_micros: int
+
+
+class SalesTotalResponse(JsonBase):
+    currency: str
+    sales_count: int
+    revenue_in_micros: int
+
+
+class StandStatsResponse(JsonBase):
+    start_day: datetime.date
+    end_day: datetime.date
+    days: list[DailySalesResponse]
+    totals: list[SalesTotalResponse]
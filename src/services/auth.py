@@ -1,26 +1,34 @@
 import datetime
 import functools
+import hashlib
 import logging
 import time
 import uuid
-from typing import Optional, NewType, Any
+from typing import Optional, NewType, Any, NamedTuple
 
 import flask
 import jwt
-import werkzeug.security
+import sqlalchemy
+import sqlalchemy.orm
 
 import constants
+from cache import TTLCache
 from exceptions import (
     ExpiredTokenError,
     InvalidCredentialsError,
     InvalidPermissionsError,
 )
 from models import AccessToken, RefreshToken, User, db
+from pagination import Page, PageRequest, paginate
 from serialization import (
+    Principal,
     TokenPair,
     JWTAccessTokenClaims,
     JWTRefreshTokenClaims,
 )
+import services.last_seen
+import services.password
+import services.permission
 import services.user
 from custom_types import PasswordPlainText, PasswordHashed
 
@@ -31,6 +39,42 @@ logger = logging.getLogger(__name__)
 RawAccessToken = NewType("RawAccessToken", str)
 
 
+class ValidatedAccessToken(NamedTuple):
+    """An access token that has been checked against the database."""
+
+    access_token_id: int
+    principal: Principal
+    permissions: frozenset[str]
+    # Set instead of ``permissions`` for tokens with compact permission claims.
+    permission_mask: Optional[int] = None
+
+
+def init_app(app: flask.Flask) -> None:
+    """Set up the access token validation cache for the app.
+
+    Validated tokens are cached by their ``jwtid`` for
+    ``ACCESS_TOKEN_CACHE_TTL`` seconds.  Revoked tokens are remembered
+    until they would have expired, so a revocation made by this worker
+    takes effect immediately.
+    """
+    app.extensions["access_token_cache"] = TTLCache(
+        maxsize=app.config["ACCESS_TOKEN_CACHE_SIZE"],
+        ttl=app.config["ACCESS_TOKEN_CACHE_TTL"],
+    )
+    app.extensions["revoked_access_tokens"] = TTLCache(
+        maxsize=app.config["ACCESS_TOKEN_CACHE_SIZE"],
+        ttl=constants.MAX_AGE_OF_ACCESS_TOKEN,
+    )
+
+
+def get_access_token_cache() -> TTLCache:
+    return flask.current_app.extensions["access_token_cache"]
+
+
+def get_revoked_access_tokens() -> TTLCache:
+    return flask.current_app.extensions["revoked_access_tokens"]
+
+
 def seconds_since_epoch():
     """Return the number of seconds since the epoch.
 
@@ -109,6 +153,15 @@ def decode_jwt_refresh_token(refresh_token: str) -> JWTRefreshTokenClaims:
     return token_claims
 
 
+def get_token_digest(token: str) -> bytes:
+    """Get the fixed size digest tokens are stored and looked up by.
+
+    Parameters:
+        token: The encoded token as a string with no auth scheme prefix.
+    """
+    return hashlib.sha256(token.encode()).digest()
+
+
 def get_access_token_by_raw_token(
     user_id: str,
     raw_access_token: RawAccessToken,
@@ -119,52 +172,199 @@ def get_access_token_by_raw_token(
         user_id: User id of the token owner.
         raw_access_token: The encoded token as a string with no auth scheme prefix.
     """
-    return AccessToken.query.filter_by(
-        user_id=user_id,
-        token=raw_access_token,
+    return AccessToken.query.filter(
+        AccessToken.user_id == user_id,
+        AccessToken.token_digest == get_token_digest(raw_access_token),
+        AccessToken.expiration > datetime.datetime.now(tz=datetime.timezone.utc),
     ).one_or_none()
 
 
+def resolve_access_token(
+    raw_access_token: RawAccessToken,
+    token_claims: JWTAccessTokenClaims,
+) -> Optional[ValidatedAccessToken]:
+    """Check an access token is active and load its user in a single query.
+
+    The user, their roles and the matching unexpired ``AccessToken`` are
+    fetched with one joined query.
+
+    Parameters:
+        raw_access_token: The encoded token as a string with no auth scheme prefix.
+        token_claims: The decoded claims of the token.
+    """
+    row = (
+        db.session.execute(
+            sqlalchemy.select(User, AccessToken.id)
+            .join(AccessToken, AccessToken.user_id == User.id)
+            .where(
+                User.id == token_claims.sub,
+                AccessToken.token_digest == get_token_digest(raw_access_token),
+                AccessToken.expiration
+                > datetime.datetime.now(tz=datetime.timezone.utc),
+            )
+            .options(sqlalchemy.orm.joinedload(User.roles))
+        )
+        .unique()
+        .one_or_none()
+    )
+    if row is None:
+        return None
+
+    user, access_token_id = row
+    permission_mask = None
+    if token_claims.perms is not None:
+        permission_mask = services.permission.decode_permissions(
+            encoded=token_claims.perms,
+            registry_version=token_claims.perms_version or "",
+        )
+        if permission_mask is None:
+            # Made for a different set of permissions, the client must refresh.
+            return None
+
+    return ValidatedAccessToken(
+        access_token_id=access_token_id,
+        principal=Principal.model_validate(user),
+        permissions=frozenset(token_claims.roles or ()),
+        permission_mask=permission_mask,
+    )
+
+
+def has_permissions(
+    validated_token: ValidatedAccessToken,
+    permissions: frozenset[str],
+) -> bool:
+    """Check a validated access token grants all of the given permissions.
+
+    Parameters:
+        validated_token: The validated access token.
+        permissions: The permissions required.
+    """
+    if validated_token.permission_mask is None:
+        return permissions <= validated_token.permissions
+
+    required_mask = services.permission.get_permission_mask(permissions)
+    if required_mask is None:
+        return False
+
+    return validated_token.permission_mask & required_mask == required_mask
+
+
 def validate_jwt_access_token(
     raw_access_token: RawAccessToken,
     token_claims: JWTAccessTokenClaims,
-    permissions: list[str],
-) -> None:
-    """Validate access token is valid.
+    permissions: frozenset[str],
+) -> Principal:
+    """Validate access token is valid, returning the user it belongs to.
 
-    If no exception is raised, then the access token is valid.
+    Tokens that were recently validated are served from the access token
+    cache without touching the database.
 
     Raises:
         InvalidCredentialsError: If access token is no longer valid
         InvalidPermissionsError: If the access token is valid, but does not have the required permissions.
     """
-    # validate access_token
-    access_token = get_access_token_by_raw_token(
-        user_id=token_claims.sub,
-        raw_access_token=raw_access_token,
-    )
-    if access_token is None:
-        raise InvalidCredentialsError()
-
     # validate expiration
     if token_claims.exp < seconds_since_epoch():
         raise InvalidCredentialsError()
 
-    access_token.last_seen_at = datetime.datetime.now(tz=datetime.timezone.utc)
+    if token_claims.jwtid in get_revoked_access_tokens():
+        raise InvalidCredentialsError()
+
+    cache = get_access_token_cache()
+    validated_token: Optional[ValidatedAccessToken] = cache.get(token_claims.jwtid)
+    if validated_token is None:
+        # validate user exists and access_token is active
+        validated_token = resolve_access_token(
+            raw_access_token=raw_access_token,
+            token_claims=token_claims,
+        )
+        if validated_token is None:
+            raise InvalidCredentialsError()
+
+        cache.set(token_claims.jwtid, validated_token)
+
+    services.last_seen.record_last_seen(validated_token.access_token_id)
 
     # validate permissions
-    if not set(permissions).issubset(set(token_claims.roles)):
+    if not has_permissions(validated_token, permissions):
         raise InvalidPermissionsError()
 
+    return validated_token.principal
+
+
+def revoke_access_token(
+    raw_access_token: RawAccessToken,
+    token_claims: JWTAccessTokenClaims,
+) -> None:
+    """Revoke an access token before it expires.
+
+    The token is expired in the database for other workers, and added to
+    this worker's revocation set so it is rejected straight away.
+
+    Parameters:
+        raw_access_token: The encoded token as a string with no auth scheme prefix.
+        token_claims: The decoded claims of the token.
+    """
+    get_revoked_access_tokens().set(token_claims.jwtid, True)
+    get_access_token_cache().pop(token_claims.jwtid)
+
+    access_token = get_access_token_by_raw_token(
+        user_id=token_claims.sub,
+        raw_access_token=raw_access_token,
+    )
+    if access_token is not None:
+        access_token.expiration = datetime.datetime.now(tz=datetime.timezone.utc)
+
+
+def revoke_refresh_token(user_id: str, refresh_token: str) -> bool:
+    """Revoke a users refresh token if it is still active.
 
-def revoke_refresh_token(refresh_token: RefreshToken) -> None:
-    """Revoke a users refresh token.
+    The check and the revocation are a single conditional ``UPDATE``, so
+    when the same token is used concurrently exactly one caller revokes
+    it.  The token is also expired, so it is cleaned up with the other
+    expired tokens.
 
     Parameters:
-        refresh_token:  The ``RefreshToken`` model.
+        user_id: The user's id.
+        refresh_token: The encoded refresh token.
+
+    Returns:
+        ``True`` if this call revoked the token, ``False`` if it was not active.
     """
-    refresh_token.last_used_at = datetime.datetime.now(tz=datetime.timezone.utc)
-    refresh_token.revoked = True
+    now = datetime.datetime.now(tz=datetime.timezone.utc)
+    revoked_id = db.session.execute(
+        sqlalchemy.update(RefreshToken)
+        .where(
+            RefreshToken.user_id == user_id,
+            RefreshToken.token_digest == get_token_digest(refresh_token),
+            RefreshToken.last_used_at.is_(None),
+            RefreshToken.revoked.is_(False),
+            RefreshToken.expiration > now,
+        )
+        .values(last_used_at=now, revoked=True, expiration=now)
+        .returning(RefreshToken.id)
+        .execution_options(synchronize_session=False)
+    ).scalar_one_or_none()
+
+    return revoked_id is not None
+
+
+def invalidate_refresh_token(user_id: str, token: str) -> None:
+    """Revoke a refresh token given in its encoded form.
+
+    Parameters:
+        user_id: The id of the user the token must belong to.
+        token: The encoded refresh token.
+
+    Raises:
+        InvalidCredentialsError: If the token is not an active refresh token of the user.
+    """
+    refresh_claims = decode_jwt_refresh_token(token)
+    if refresh_claims.sub != user_id:
+        raise InvalidCredentialsError()
+
+    if not revoke_refresh_token(user_id=user_id, refresh_token=token):
+        raise InvalidCredentialsError()
 
 
 def auth_required(permissions: list[str]):
@@ -190,6 +390,8 @@ def auth_required(permissions: list[str]):
 
     """
 
+    required_permissions = frozenset(permissions)
+
     def inner_decorator(f):
         @functools.wraps(f)
         def decorated(*args, **kwargs):
@@ -197,15 +399,10 @@ def auth_required(permissions: list[str]):
             token = get_raw_access_token_from_request_headers()
             token_claims = decode_jwt_access_token(token)
 
-            # validate user exists
-            user = services.user.get_user_by_id(token_claims.sub)
-            if user is None:
-                raise InvalidCredentialsError()
-
-            validate_jwt_access_token(
+            user = validate_jwt_access_token(
                 raw_access_token=token,
                 token_claims=token_claims,
-                permissions=permissions,
+                permissions=required_permissions,
             )
 
             flask.g.user = user
@@ -224,12 +421,21 @@ def create_access_token_for_user(
 ) -> str:
     """Create and access token for a user.
 
+    When ``JWT_COMPACT_PERMISSIONS`` is set, permissions are encoded as a
+    bitset against the permission registry rather than listed by name.
+
     Parameters:
         user_id: Id of the user.
         permissions:  Permissions for the user.
     """
     issued_at_seconds = seconds_since_epoch()
 
+    if flask.current_app.config["JWT_COMPACT_PERMISSIONS"]:
+        perms, perms_version = services.permission.encode_permissions(permissions)
+        permission_claims = dict(perms=perms, perms_version=perms_version)
+    else:
+        permission_claims = dict(roles=permissions)
+
     return jwt.encode(
         payload=dict(
             sub=user_id,
@@ -238,7 +444,7 @@ def create_access_token_for_user(
             exp=issued_at_seconds + constants.MAX_AGE_OF_ACCESS_TOKEN,
             iat=issued_at_seconds,
             jwtid=str(uuid.uuid4()),
-            roles=permissions,
+            **permission_claims,
         ),
         key=str(flask.current_app.config["SECRET_KEY"]),
         algorithm=flask.current_app.config["JWT_ALGORITHM"],
@@ -288,6 +494,7 @@ def register_token_pair_creation_for_user(
             AccessToken(
                 user_id=user.id,
                 token=token_pair.access_token,
+                token_digest=get_token_digest(token_pair.access_token),
                 ip_address=ip_address,
                 user_agent=user_agent,
                 expiration=(
@@ -299,12 +506,12 @@ def register_token_pair_creation_for_user(
             ),
             RefreshToken(
                 user_id=user.id,
-                token=token_pair.refresh_token,
+                token_digest=get_token_digest(token_pair.refresh_token),
                 ip_address=ip_address,
                 user_agent=user_agent,
                 expiration=(
                     current_datetime_in_utc
-                    + datetime.timedelta(constants.MAX_AGE_OF_REFRESH_TOKEN)
+                    + datetime.timedelta(seconds=constants.MAX_AGE_OF_REFRESH_TOKEN)
                 ),
                 created_at=current_datetime_in_utc,
             ),
@@ -341,35 +548,35 @@ def check_password_hash(
     password_hash: PasswordHashed,
     password_plain_text: PasswordPlainText,
 ) -> bool:
-    """Check the password hash matches the provided plain text password."""
-    return werkzeug.security.check_password_hash(
+    """Check the password hash matches the provided plain text password.
+
+    Raises:
+        ServiceUnavailableError: If the password hashing pool is saturated.
+    """
+    return services.password.check_password_hash(
         password_hash,
         password_plain_text.get_secret_value(),
     )
 
 
-def get_existing_refresh_token_for_user(
-    user_id: str,
-    refresh_token: str,
-) -> Optional[RefreshToken]:
-    """Get the users existing refresh token.
-
-    Parameters:
-        user_id: The user's id.
-        refresh_token: The refresh token of the user.
-    """
-    return RefreshToken.query.filter_by(
-        user_id=user_id,
-        token=refresh_token,
-        last_used_at=None,
-        revoked=False,
-    ).one_or_none()
-
-
-def get_all_access_tokens_for_user(user_id: str) -> list[AccessToken]:
-    """Get all of the users access tokens.
+def get_all_access_tokens_for_user(user_id: str, page_request: PageRequest) -> Page:
+    """Get a page of the users access tokens, as read-only rows.
 
     Parameters:
         user_id: The user's id.
+        page_request: The page of tokens to get.
     """
-    return AccessToken.query.filter_by(user_id=user_id).all()
+    return paginate(
+        AccessToken.query.with_entities(
+            AccessToken.id,
+            AccessToken.user_id,
+            AccessToken.ip_address,
+            AccessToken.user_agent,
+            AccessToken.token,
+            AccessToken.expiration,
+            AccessToken.created_at,
+            AccessToken.last_seen_at,
+        ).filter(AccessToken.user_id == user_id),
+        page_request=page_request,
+        order_by=[AccessToken.id],
+    )
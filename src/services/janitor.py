@@ -0,0 +1,142 @@
+import atexit
+import datetime
+import logging
+import threading
+
+import flask
+import sqlalchemy
+
+from models import AccessToken, RefreshToken, db
+
+logger = logging.getLogger(__name__)
+
+
+class TokenJanitor:
+    """Periodically delete access and refresh tokens that have expired.
+
+    Revoked tokens are expired when they are revoked, so they are removed
+    too.  Tokens are kept for ``retention`` seconds after they expire, and
+    deleted ``batch_size`` rows per transaction so no long locks are held
+    on the token tables.
+
+    Parameters:
+        app: The flask app, used to get an app context for each run.
+        interval: Seconds between runs.
+        retention: Seconds to keep a token after it has expired.
+        batch_size: Maximum number of rows deleted per transaction.
+    """
+
+    def __init__(
+        self,
+        app: flask.Flask,
+        interval: float,
+        retention: float,
+        batch_size: int,
+    ):
+        self.app = app
+        self.interval = interval
+        self.retention = retention
+        self.batch_size = batch_size
+        self.runs = 0
+        self.last_run_purged: dict[str, int] = {}
+        self.total_purged: dict[str, int] = {}
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run,
+            name="token-janitor",
+            daemon=True,
+        )
+
+    def start(self) -> None:
+        """Start running in a background thread."""
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background thread, letting a run in progress finish."""
+        self._stopped.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def run_once(self) -> dict[str, int]:
+        """Delete expired tokens, returning the rows purged per table."""
+        cutoff = datetime.datetime.now(tz=datetime.timezone.utc) - datetime.timedelta(
+            seconds=self.retention
+        )
+
+        purged = {}
+        with self.app.app_context():
+            for model in (AccessToken, RefreshToken):
+                purged[model.__tablename__] = self._purge(model, cutoff)
+
+        self.runs += 1
+        self.last_run_purged = purged
+        for table, count in purged.items():
+            self.total_purged[table] = self.total_purged.get(table, 0) + count
+
+        logger.info(
+            "Token janitor run %s purged %s, %s in total.",
+            self.runs,
+            purged,
+            self.total_purged,
+        )
+        return purged
+
+    def _purge(self, model: type[db.Model], cutoff: datetime.datetime) -> int:
+        purged = 0
+        while not self._stopped.is_set():
+            # SKIP LOCKED lets janitors in other workers take different rows.
+            expired_ids = (
+                sqlalchemy.select(model.id)
+                .where(model.expiration < cutoff)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            result = db.session.execute(
+                sqlalchemy.delete(model)
+                .where(model.id.in_(expired_ids))
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+
+            purged += result.rowcount
+            if result.rowcount < self.batch_size:
+                break
+
+        return purged
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("Token janitor run failed.")
+
+
+def init_app(app: flask.Flask) -> None:
+    """Start the token janitor for the app.
+
+    The janitor is disabled when ``TOKEN_JANITOR_INTERVAL`` is ``0``.
+    """
+    if app.config["TOKEN_JANITOR_INTERVAL"] <= 0:
+        return
+
+    janitor = TokenJanitor(
+        app=app,
+        interval=app.config["TOKEN_JANITOR_INTERVAL"],
+        retention=app.config["TOKEN_RETENTION"],
+        batch_size=app.config["TOKEN_JANITOR_BATCH_SIZE"],
+    )
+    janitor.start()
+    atexit.register(janitor.stop)
+    app.extensions["token_janitor"] = janitor
+
+
+def stop(app: flask.Flask) -> None:
+    """Stop the app's token janitor, if it is running.
+
+    For apps that are done with before the process exits, like in tests.
+    """
+    janitor = app.extensions.get("token_janitor")
+    if janitor is not None:
+        atexit.unregister(janitor.stop)
+        janitor.stop()
@@ -0,0 +1,147 @@
+import atexit
+import datetime
+import logging
+import threading
+
+import flask
+import sqlalchemy
+
+from models import AccessToken, db
+
+logger = logging.getLogger(__name__)
+
+
+class LastSeenBuffer:
+    """Coalesce ``AccessToken.last_seen_at`` updates and write them in batches.
+
+    Only the latest timestamp for each access token is kept in memory.
+    Pending timestamps are written with a single ``UPDATE`` every
+    ``flush_interval`` seconds, or sooner once ``max_size`` tokens are
+    pending.
+
+    Parameters:
+        app: The flask app, used to get an app context when flushing.
+        flush_interval: Seconds between flushes.
+        max_size: Number of pending tokens that triggers an early flush.
+    """
+
+    def __init__(self, app: flask.Flask, flush_interval: float, max_size: int):
+        self.app = app
+        self.flush_interval = flush_interval
+        self.max_size = max_size
+        self._pending: dict[int, datetime.datetime] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run,
+            name="last-seen-buffer",
+            daemon=True,
+        )
+
+    def start(self) -> None:
+        """Start flushing in a background thread."""
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background thread and write anything still pending."""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self.flush()
+
+    def record(self, access_token_id: int, seen_at: datetime.datetime) -> None:
+        """Remember that an access token was used at ``seen_at``."""
+        with self._lock:
+            previous = self._pending.get(access_token_id)
+            if previous is None or previous < seen_at:
+                self._pending[access_token_id] = seen_at
+            pending_count = len(self._pending)
+
+        if pending_count >= self.max_size:
+            self._wakeup.set()
+
+    def flush(self) -> int:
+        """Write all pending timestamps, returning the number of tokens written."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+
+        if not pending:
+            return 0
+
+        last_seen = sqlalchemy.values(
+            sqlalchemy.column("id", sqlalchemy.Integer),
+            sqlalchemy.column("last_seen_at", sqlalchemy.DateTime(timezone=True)),
+            name="last_seen",
+        ).data(list(pending.items()))
+
+        with self.app.app_context():
+            try:
+                db.session.execute(
+                    sqlalchemy.update(AccessToken)
+                    .where(AccessToken.id == last_seen.c.id)
+                    .where(AccessToken.last_seen_at < last_seen.c.last_seen_at)
+                    .values(last_seen_at=last_seen.c.last_seen_at)
+                    .execution_options(synchronize_session=False)
+                )
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                logger.exception("Failed to flush access token last seen times.")
+                # Keep the timestamps for the next flush, unless a newer one
+                # was recorded in the meantime.
+                with self._lock:
+                    for access_token_id, seen_at in pending.items():
+                        if self._pending.get(access_token_id, seen_at) <= seen_at:
+                            self._pending[access_token_id] = seen_at
+                return 0
+
+        return len(pending)
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+
+def init_app(app: flask.Flask) -> None:
+    """Start the last seen buffer for the app and drain it on shutdown.
+
+    Calling it again for the same app keeps the buffer already running.
+    """
+    if "last_seen_buffer" in app.extensions:
+        return
+
+    buffer = LastSeenBuffer(
+        app=app,
+        flush_interval=app.config["LAST_SEEN_FLUSH_INTERVAL"],
+        max_size=app.config["LAST_SEEN_BUFFER_SIZE"],
+    )
+    buffer.start()
+    atexit.register(buffer.stop)
+    app.extensions["last_seen_buffer"] = buffer
+
+
+def stop(app: flask.Flask) -> None:
+    """Stop the app's last seen buffer and write anything still pending.
+
+    For apps that are done with before the process exits, like in tests.
+    """
+    buffer = app.extensions.get("last_seen_buffer")
+    if buffer is not None:
+        atexit.unregister(buffer.stop)
+        buffer.stop()
+
+
+def record_last_seen(access_token_id: int) -> None:
+    """Buffer the current time as the last time an access token was used.
+
+    Parameters:
+        access_token_id: Id of the ``AccessToken`` that was used.
+    """
+    flask.current_app.extensions["last_seen_buffer"].record(
+        access_token_id,
+        datetime.datetime.now(tz=datetime.timezone.utc),
+    )
@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import threading
+from typing import Iterable, NamedTuple, Optional
+
+import flask
+import sqlalchemy
+
+import geohash
+import services.stand_changes
+import services.stand_index
+import services.stand_search
+from cache import TTLCache
+from models import LemonadeStand, db
+
+
+class NearMeCacheEntry(NamedTuple):
+    """The stands that can be near any point of a geohash cell."""
+
+    longitude: float
+    latitude: float
+    reach: float
+    stand_ids: frozenset[int]
+    candidates: list[services.stand_index.NearbyStand]
+
+
+class NearMeCache:
+    """Cache near-me results per geohash cell, radius and limit.
+
+    Nearby clients fall in the same cell and share one entry.  An entry
+    holds every stand that can be one of the ``limit`` nearest stands
+    within ``radius`` of any point in the cell.  Distances are measured
+    from each caller's own point, so a cached answer is the same as an
+    uncached one.
+
+    The candidates are found around the cell's centre.  If the ``limit``
+    nearest stands are at most ``d`` from the centre, and no point in the
+    cell is more than ``h`` from it, then the nearest stands to any point
+    in the cell are at most ``d + 2h`` from the centre.
+
+    Entries are evicted when a stand within their reach, or one of their
+    candidates, is changed in this process.  Stands changed by other
+    processes are only seen once an entry is older than ``ttl``, which is
+    why the cache is off unless ``NEAR_ME_CACHE_SIZE`` is set.
+
+    Parameters:
+        maxsize: Maximum number of cached cells.
+        ttl: Seconds an entry is used for.
+        precision: Length of the geohash of a cell.
+        max_candidates: Maximum stands cached per cell.  Cells with more
+            are not cached.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        precision: int,
+        max_candidates: int,
+    ):
+        self.precision = precision
+        self.max_candidates = max_candidates
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._changed_ids: set[int] = set()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def mark_changed(self, stand_ids: Iterable[int]) -> None:
+        """Evict the entries the given stands can be in on the next lookup."""
+        with self._lock:
+            self._changed_ids.update(stand_ids)
+            self._generation += 1
+
+    def _evict_changed(self) -> None:
+        with self._lock:
+            changed_ids, self._changed_ids = self._changed_ids, set()
+        if not changed_ids:
+            return
+
+        # Looked up in the session of the request being answered.
+        positions = db.session.execute(
+            sqlalchemy.select(LemonadeStand.longitude, LemonadeStand.latitude).where(
+                LemonadeStand.id.in_(changed_ids)
+            )
+        ).all()
+
+        def is_stale(key, entry: NearMeCacheEntry) -> bool:
+            if not changed_ids.isdisjoint(entry.stand_ids):
+                return True
+            return any(
+                services.stand_index.distance_on_sphere(
+                    entry.longitude, entry.latitude, *position
+                )
+                <= entry.reach
+                for position in positions
+            )
+
+        self._entries.evict(is_stale)
+
+    def _load(self, cell: str, radius: float, limit: int) -> Optional[NearMeCacheEntry]:
+        west, south, east, north = geohash.bounds(cell)
+        longitude = (west + east) / 2
+        latitude = (south + north) / 2
+        # The corner furthest from the centre is on the side nearer a pole.
+        half_size = max(
+            services.stand_index.distance_on_sphere(
+                longitude, latitude, corner_longitude, corner_latitude
+            )
+            for corner_longitude in (west, east)
+            for corner_latitude in (south, north)
+        )
+
+        reach = radius + half_size
+        nearest = services.stand_search.find_lemonade_stands_near(
+            longitude=longitude, latitude=latitude, radius=reach, limit=limit
+        )
+        if len(nearest) == limit:
+            reach = min(reach, nearest[-1].distance + 2 * half_size)
+            nearest = services.stand_search.find_lemonade_stands_near(
+                longitude=longitude,
+                latitude=latitude,
+                radius=reach,
+                limit=self.max_candidates + 1,
+            )
+            if len(nearest) > self.max_candidates:
+                return None
+
+        return NearMeCacheEntry(
+            longitude=longitude,
+            latitude=latitude,
+            reach=reach,
+            stand_ids=frozenset(stand.id for stand in nearest),
+            candidates=[
+                services.stand_index.NearbyStand(
+                    id=stand.id,
+                    name=stand.name,
+                    current_price_in_micros=stand.current_price_in_micros,
+                    longitude=stand.longitude,
+                    latitude=stand.latitude,
+                    distance=0.0,
+                )
+                for stand in nearest
+            ],
+        )
+
+    def nearest(
+        self,
+        longitude: float,
+        latitude: float,
+        radius: float,
+        limit: int,
+    ) -> list[services.stand_index.NearbyStand]:
+        """Get the stands nearest to a point, nearest first.
+
+        Parameters:
+            longitude: Longitude of the point.
+            latitude: Latitude of the point.
+            radius: Maximum distance in metres.
+            limit: Maximum number of stands to return.
+        """
+        self._evict_changed()
+
+        cell = geohash.encode(longitude, latitude, self.precision)
+        key = (cell, radius, limit)
+        entry = self._entries.get(key)
+        if entry is None:
+            generation = self._generation
+            entry = self._load(cell, radius, limit)
+            if entry is None:
+                return services.stand_search.find_lemonade_stands_near(
+                    longitude=longitude, latitude=latitude, radius=radius, limit=limit
+                )
+            # Stands changed while loading may be missing from the entry.
+            if generation == self._generation:
+                self._entries.set(key, entry)
+
+        nearby = []
+        for stand in entry.candidates:
+            distance = services.stand_index.distance_on_sphere(
+                longitude, latitude, stand.longitude, stand.latitude
+            )
+            if distance <= radius:
+                nearby.append(stand._replace(distance=distance))
+
+        nearby.sort(key=lambda stand: (stand.distance, stand.id))
+        return nearby[:limit]
+
+
+def init_app(app: flask.Flask) -> None:
+    """Create the near-me cache for the app.
+
+    The cache is disabled when ``NEAR_ME_CACHE_SIZE`` is ``0``, the default.
+    """
+    if app.config["NEAR_ME_CACHE_SIZE"] <= 0:
+        return
+
+    near_me_cache = NearMeCache(
+        maxsize=app.config["NEAR_ME_CACHE_SIZE"],
+        ttl=app.config["NEAR_ME_CACHE_TTL"],
+        precision=app.config["NEAR_ME_CACHE_PRECISION"],
+        max_candidates=app.config["NEAR_ME_CACHE_MAX_CANDIDATES"],
+    )
+    services.stand_changes.add_stand_change_listener(
+        app, lambda changes: near_me_cache.mark_changed(changes.stand_ids)
+    )
+    app.extensions["near_me_cache"] = near_me_cache
+
+
+def get_near_me_cache() -> Optional[NearMeCache]:
+    return flask.current_app.extensions.get("near_me_cache")
@@ -0,0 +1,130 @@
+import atexit
+import concurrent.futures
+import multiprocessing
+import os
+import secrets
+import threading
+from typing import Any, Callable, Optional
+
+import flask
+import werkzeug.security
+
+from custom_types import PasswordHashed
+from exceptions import ServiceUnavailableError
+
+
+class PasswordHasher:
+    """Hash and verify passwords in a bounded pool of worker processes.
+
+    Key derivation is CPU bound and holds the GIL, so it is moved out of
+    the request thread into separate processes.  At most ``pool_size``
+    hashes run at once, and at most ``max_queue_depth`` more may wait for
+    a free worker.  Anything beyond that is shed with a
+    ``ServiceUnavailableError`` rather than queued.
+
+    Workers are started by a fork server rather than forked from the app,
+    which by then runs threads and holds database connections.
+
+    A ``pool_size`` of ``0`` hashes inline on the calling thread.
+
+    Parameters:
+        pool_size: Number of worker processes.
+        max_queue_depth: Number of hashes allowed to wait for a worker.
+    """
+
+    def __init__(self, pool_size: int, max_queue_depth: int):
+        self.pool_size = pool_size
+        self.max_queue_depth = max_queue_depth
+        # Checked against when a user does not exist, so unknown emails take
+        # as long as wrong passwords.
+        self.dummy_password_hash = PasswordHashed(
+            werkzeug.security.generate_password_hash(secrets.token_urlsafe())
+        )
+        self._executor: Optional[concurrent.futures.ProcessPoolExecutor] = None
+        self._slots = threading.BoundedSemaphore(pool_size + max_queue_depth)
+        if pool_size > 0:
+            self._executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=pool_size,
+                mp_context=multiprocessing.get_context("forkserver"),
+            )
+
+    def start(self) -> None:
+        """Start every worker process, rather than one on each of the first hashes."""
+        if self._executor is None:
+            return
+
+        # The pool starts a worker for each task submitted while none is
+        # idle, so a no-op per worker starts them all.
+        futures = [self._executor.submit(os.getpid) for _ in range(self.pool_size)]
+        concurrent.futures.wait(futures)
+
+    def shutdown(self) -> None:
+        """Stop the worker processes."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def _run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        if self._executor is None:
+            return fn(*args)
+
+        if not self._slots.acquire(blocking=False):
+            raise ServiceUnavailableError()
+
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
+
+    def generate_password_hash(self, password: str) -> PasswordHashed:
+        """Hash a plain text password."""
+        return PasswordHashed(
+            self._run(werkzeug.security.generate_password_hash, password)
+        )
+
+    def check_password_hash(self, password_hash: PasswordHashed, password: str) -> bool:
+        """Check a plain text password against a password hash."""
+        return self._run(
+            werkzeug.security.check_password_hash, password_hash, password
+        )
+
+
+def init_app(app: flask.Flask) -> None:
+    """Start the password hashing pool for the app."""
+    hasher = PasswordHasher(
+        pool_size=app.config["PASSWORD_HASH_POOL_SIZE"],
+        max_queue_depth=app.config["PASSWORD_HASH_QUEUE_DEPTH"],
+    )
+    hasher.start()
+    atexit.register(hasher.shutdown)
+    app.extensions["password_hasher"] = hasher
+
+
+def get_password_hasher() -> PasswordHasher:
+    return flask.current_app.extensions["password_hasher"]
+
+
+def generate_password_hash(password: str) -> PasswordHashed:
+    """Hash a plain text password using the app's hashing pool.
+
+    Raises:
+        ServiceUnavailableError: If too many hashes are already waiting.
+    """
+    return get_password_hasher().generate_password_hash(password)
+
+
+def get_dummy_password_hash() -> PasswordHashed:
+    """Get a hash no password matches, for checking unknown users against."""
+    return get_password_hasher().dummy_password_hash
+
+
+def check_password_hash(password_hash: PasswordHashed, password: str) -> bool:
+    """Check a password against a hash using the app's hashing pool.
+
+    Raises:
+        ServiceUnavailableError: If too many hashes are already waiting.
+    """
+    return get_password_hasher().check_password_hash(password_hash, password)
@@ -0,0 +1,254 @@
+import base64
+import functools
+import hashlib
+import operator
+import threading
+import time
+from typing import Iterable, Optional
+
+import flask
+import sqlalchemy
+import sqlalchemy.orm
+
+from models import Permission, Role, db, roles_to_permissions
+
+
+class RolePermissionCache:
+    """A versioned, in-memory map of role id to the role's permission names.
+
+    The whole map is loaded with one query, and reloaded on the next read
+    after ``invalidate`` bumps the version.  Commits in this process
+    invalidate it, and it is also reloaded once it is older than
+    ``max_age`` seconds, to pick up changes made by other processes.
+
+    The cache is also the registry for compact permission bitsets, where
+    each permission is the bit at its ``Permission.id``.  The registry
+    version is a digest of every permission id and name, so it is the same
+    in every worker and only changes when the set of permissions does.
+
+    Parameters:
+        max_age: Seconds before the permissions are reloaded, ``0`` never
+            reloads them.
+    """
+
+    def __init__(self, max_age: float):
+        self.max_age = max_age
+        self.version = 0
+        self._loaded_version = -1
+        self._loaded_at = 0.0
+        self.registry_version = ""
+        self._permissions_by_role: dict[int, frozenset[str]] = {}
+        self._permission_ids: dict[str, int] = {}
+        self._masks: dict[frozenset[str], int] = {}
+        self._lock = threading.Lock()
+
+    def invalidate(self) -> None:
+        """Mark the cached permissions as stale."""
+        with self._lock:
+            self.version += 1
+
+    def load(self) -> None:
+        """Load the permissions of every role.
+
+        Needs an app context, whose session is used to query the permissions,
+        so a reload while serving a request uses the request's connection.
+        """
+        with self._lock:
+            version = self.version
+            loaded_at = time.monotonic()
+
+        rows = db.session.execute(
+            sqlalchemy.select(
+                Permission.id, Permission.name, roles_to_permissions.c.role_id
+            ).outerjoin(
+                roles_to_permissions,
+                Permission.id == roles_to_permissions.c.permission_id,
+            )
+        ).all()
+
+        permission_ids: dict[str, int] = {}
+        permissions_by_role: dict[int, set[str]] = {}
+        for permission_id, permission_name, role_id in rows:
+            permission_ids[permission_name] = permission_id
+            if role_id is not None:
+                permissions_by_role.setdefault(role_id, set()).add(permission_name)
+
+        registry = "\n".join(
+            f"{permission_id}:{permission_name}"
+            for permission_name, permission_id in sorted(
+                permission_ids.items(), key=operator.itemgetter(1)
+            )
+        )
+
+        with self._lock:
+            self._permissions_by_role = {
+                role_id: frozenset(names)
+                for role_id, names in permissions_by_role.items()
+            }
+            self._permission_ids = permission_ids
+            self._masks = {}
+            self.registry_version = hashlib.sha256(registry.encode()).hexdigest()[:8]
+            self._loaded_version = version
+            self._loaded_at = loaded_at
+
+    def _ensure_loaded(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            expired = self.max_age > 0 and now - self._loaded_at > self.max_age
+            if expired:
+                # Other threads keep using the current permissions while
+                # reloading.
+                self._loaded_at = now
+        if expired or self._loaded_version != self.version:
+            self.load()
+
+    def get(self, role_ids: Iterable[int]) -> frozenset[str]:
+        """Get the combined permissions of the given roles."""
+        self._ensure_loaded()
+
+        permissions_by_role = self._permissions_by_role
+        return frozenset().union(
+            *(permissions_by_role.get(role_id, frozenset()) for role_id in role_ids)
+        )
+
+    def get_mask(self, permissions: frozenset[str]) -> Optional[int]:
+        """Get the bitset of the given permissions.
+
+        Returns ``None`` if any of the permissions is unknown.
+        """
+        self._ensure_loaded()
+
+        masks = self._masks
+        mask = masks.get(permissions)
+        if mask is None:
+            permission_ids = self._permission_ids
+            if not permissions.issubset(permission_ids):
+                return None
+
+            mask = functools.reduce(
+                operator.or_,
+                (1 << permission_ids[name] for name in permissions),
+                0,
+            )
+            masks[permissions] = mask
+
+        return mask
+
+    def encode(self, permissions: Iterable[str]) -> tuple[str, str]:
+        """Encode permissions as a base64url bitset and the registry version."""
+        self._ensure_loaded()
+
+        known_permissions = frozenset(permissions).intersection(self._permission_ids)
+        mask = self.get_mask(known_permissions) or 0
+        mask_bytes = mask.to_bytes(max(1, (mask.bit_length() + 7) // 8), "big")
+        encoded = base64.urlsafe_b64encode(mask_bytes).rstrip(b"=").decode()
+        return encoded, self.registry_version
+
+    def decode(self, encoded: str, registry_version: str) -> Optional[int]:
+        """Decode a base64url bitset, if it was made for the current registry."""
+        self._ensure_loaded()
+
+        if registry_version != self.registry_version:
+            return None
+
+        try:
+            mask_bytes = base64.urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4))
+        except ValueError:
+            return None
+
+        return int.from_bytes(mask_bytes, "big")
+
+
+def init_app(app: flask.Flask) -> None:
+    """Load the role permissions for the app."""
+    cache = RolePermissionCache(max_age=app.config["ROLE_PERMISSIONS_MAX_AGE"])
+    with app.app_context():
+        cache.load()
+    app.extensions["role_permissions"] = cache
+
+
+def get_role_permission_cache() -> RolePermissionCache:
+    return flask.current_app.extensions["role_permissions"]
+
+
+def get_permissions_for_roles(role_ids: Iterable[int]) -> frozenset[str]:
+    """Get the combined permissions of the given roles.
+
+    Parameters:
+        role_ids: Ids of the roles.
+    """
+    return get_role_permission_cache().get(role_ids)
+
+
+def get_permission_mask(permissions: frozenset[str]) -> Optional[int]:
+    """Get the bitset of the given permissions in the current registry.
+
+    Returns ``None`` if any of the permissions is unknown.
+
+    Parameters:
+        permissions: Names of the permissions.
+    """
+    return get_role_permission_cache().get_mask(permissions)
+
+
+def encode_permissions(permissions: Iterable[str]) -> tuple[str, str]:
+    """Encode permissions as a compact bitset for an access token.
+
+    Unknown permissions are left out.
+
+    Parameters:
+        permissions: Names of the permissions.
+
+    Returns:
+        The base64url encoded bitset, and the registry version it is valid for.
+    """
+    return get_role_permission_cache().encode(permissions)
+
+
+def decode_permissions(encoded: str, registry_version: str) -> Optional[int]:
+    """Decode a compact permission bitset from an access token.
+
+    Returns ``None`` if the bitset was made for a different registry
+    version, or can not be decoded.
+
+    Parameters:
+        encoded: The base64url encoded bitset.
+        registry_version: The registry version the bitset was made for.
+    """
+    return get_role_permission_cache().decode(encoded, registry_version)
+
+
+@sqlalchemy.event.listens_for(sqlalchemy.orm.Session, "after_flush")
+def _track_role_permission_changes(session, flush_context) -> None:
+    def changes_role_permissions(instance) -> bool:
+        if isinstance(instance, Permission):
+            return True
+        if isinstance(instance, Role):
+            # Adding users to a role does not change its permissions.
+            state = sqlalchemy.inspect(instance)
+            return (
+                instance in session.new
+                or instance in session.deleted
+                or state.attrs.permissions.history.has_changes()
+            )
+        return False
+
+    changed = (*session.new, *session.dirty, *session.deleted)
+    if any(changes_role_permissions(instance) for instance in changed):
+        session.info["role_permissions_changed"] = True
+
+
+@sqlalchemy.event.listens_for(sqlalchemy.orm.Session, "after_commit")
+def _invalidate_role_permissions(session) -> None:
+    if not session.info.pop("role_permissions_changed", False):
+        return
+
+    if flask.has_app_context():
+        cache = flask.current_app.extensions.get("role_permissions")
+        if cache is not None:
+            cache.invalidate()
+
+
+@sqlalchemy.event.listens_for(sqlalchemy.orm.Session, "after_rollback")
+def _forget_role_permission_changes(session) -> None:
+    session.info.pop("role_permissions_changed", None)
@@ -0,0 +1,163 @@
+import atexit
+import concurrent.futures
+import logging
+import queue
+import threading
+import time
+from typing import Any, Mapping, Optional
+
+import flask
+
+import services.stand
+from exceptions import ServiceUnavailableError
+from models import db
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class SaleWriteQueue:
+    """Coalesce sale inserts from concurrent requests into shared commits.
+
+    A background thread takes the first waiting sale, collects more for up
+    to ``window`` seconds or until ``max_batch_size`` sales are waiting,
+    and writes them all in one transaction.  Every request waits on a
+    future that is resolved once its sale is committed, so one commit and
+    fsync is paid per batch instead of per sale.
+
+    Parameters:
+        app: The flask app, used to get an app context when writing.
+        window: Seconds to collect sales after the first one arrives.
+        max_batch_size: Maximum number of sales written per commit.
+    """
+
+    def __init__(self, app: flask.Flask, window: float, max_batch_size: int):
+        self.app = app
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self.commits = 0
+        self.sales_written = 0
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._stopped = threading.Event()
+        # Held while checking for a stop and queueing, so no sale is queued
+        # after the stop sentinel, where it would never be written.
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(
+            target=self._run,
+            name="sale-write-queue",
+            daemon=True,
+        )
+
+    def start(self) -> None:
+        """Start writing in a background thread."""
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background thread once every waiting sale is written."""
+        with self._lock:
+            self._stopped.set()
+            self._queue.put(_STOP)
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def submit(self, sale: Mapping[str, Any]) -> concurrent.futures.Future:
+        """Queue a sale to be written.
+
+        Parameters:
+            sale: A ``lemonade_stand_sale`` row.
+
+        Returns:
+            A future that is resolved once the sale is committed, or fails
+            with the error that kept it from being written.
+
+        Raises:
+            ServiceUnavailableError: If the queue has been stopped.
+        """
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        with self._lock:
+            if self._stopped.is_set():
+                raise ServiceUnavailableError()
+            self._queue.put((sale, future))
+        return future
+
+    def _collect(self, first) -> tuple[list, bool]:
+        batch = [first]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+
+        return batch, False
+
+    def _write(self, batch: list) -> None:
+        with self.app.app_context():
+            try:
+                services.stand.insert_lemonade_stand_sales([sale for sale, _ in batch])
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                if len(batch) == 1:
+                    batch[0][1].set_exception(e)
+                    return
+
+                # Write the sales one by one, so a bad sale, like one for a
+                # stand that was just deleted, does not fail the others.
+                logger.warning("Failed to write %s sales together.", len(batch))
+                for item in batch:
+                    self._write([item])
+                return
+
+        self.commits += 1
+        self.sales_written += len(batch)
+        for _, future in batch:
+            future.set_result(None)
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+
+            batch, stopping = self._collect(item)
+            self._write(batch)
+
+        # Write anything queued while stopping.
+        pending = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                pending.append(item)
+        for start in range(0, len(pending), self.max_batch_size):
+            self._write(pending[start : start + self.max_batch_size])
+
+
+def init_app(app: flask.Flask) -> None:
+    """Start the sale write queue for the app, if ``SALE_WRITE_QUEUE_ENABLED``."""
+    if not app.config["SALE_WRITE_QUEUE_ENABLED"]:
+        return
+
+    write_queue = SaleWriteQueue(
+        app=app,
+        window=app.config["SALE_WRITE_QUEUE_WINDOW"],
+        max_batch_size=app.config["SALE_WRITE_QUEUE_MAX_BATCH_SIZE"],
+    )
+    write_queue.start()
+    atexit.register(write_queue.stop)
+    app.extensions["sale_write_queue"] = write_queue
+
+
+def get_sale_write_queue() -> Optional[SaleWriteQueue]:
+    return flask.current_app.extensions.get("sale_write_queue")
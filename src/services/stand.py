@@ -1,19 +1,242 @@
-from typing import Optional
+import datetime
+from typing import Any, Iterable, Mapping, NamedTuple, Optional, Sequence
 
-from models import LemonadeStand, LemonadeStandSale
+import sqlalchemy.orm
 
+import constants
+import services.near_me_cache
+import services.stand_index
+import services.stand_search
+import services.stats
+from models import LemonadeStand, LemonadeStandSale, db
+from pagination import Page, PageRequest, paginate
+from serialization import BatchSaleRequest
 
-def get_owners_lemonade_stands(owner_id) -> list[LemonadeStand]:
-    return LemonadeStand.query.filter_by(owner_id=owner_id).all()
+
+class StandRow(NamedTuple):
+    """A read-only stand with its recent sales, for listing without ORM objects."""
+
+    id: int
+    name: str
+    owner_id: str
+    location: tuple[float, float]
+    created_at: datetime.datetime
+    updated_at: datetime.datetime
+    currency: str
+    current_price_in_micros: int
+    sales: list[sqlalchemy.Row]
+
+
+_STAND_ROW_COLUMNS = (
+    LemonadeStand.id,
+    LemonadeStand.name,
+    LemonadeStand.owner_id,
+    LemonadeStand.longitude,
+    LemonadeStand.latitude,
+    LemonadeStand.created_at,
+    LemonadeStand.updated_at,
+    LemonadeStand.currency,
+    LemonadeStand.current_price_in_micros,
+)
+_SALE_ROW_COLUMNS = (
+    LemonadeStandSale.id,
+    LemonadeStandSale.date,
+    LemonadeStandSale.currency,
+    LemonadeStandSale.price_in_micros,
+)
+
+
+def _owners_stand_rows_query(owner_id):
+    return LemonadeStand.query.with_entities(*_STAND_ROW_COLUMNS).filter(
+        LemonadeStand.owner_id == owner_id
+    )
+
+
+def _to_stand_rows(stands: Sequence[sqlalchemy.Row]) -> list[StandRow]:
+    # Load the most recent sales of every stand with one extra query, like
+    # selectinload.  The lateral join reads at most EMBEDDED_STAND_SALES_LIMIT
+    # sales of each stand from the (lemonade_stand_id, date, id) index, so a
+    # page costs the same however many sales its stands have.
+    sales: dict[int, list[sqlalchemy.Row]] = {stand.id: [] for stand in stands}
+    if sales:
+        recent_sales = (
+            sqlalchemy.select(*_SALE_ROW_COLUMNS)
+            .where(LemonadeStandSale.lemonade_stand_id == LemonadeStand.id)
+            .order_by(LemonadeStandSale.date.desc(), LemonadeStandSale.id.desc())
+            .limit(constants.EMBEDDED_STAND_SALES_LIMIT)
+            .lateral()
+        )
+        for sale in db.session.execute(
+            sqlalchemy.select(LemonadeStand.id.label("lemonade_stand_id"), recent_sales)
+            .join(recent_sales, sqlalchemy.true())
+            .where(LemonadeStand.id.in_(sales))
+        ):
+            sales[sale.lemonade_stand_id].append(sale)
+
+    return [
+        StandRow(
+            id=stand.id,
+            name=stand.name,
+            owner_id=stand.owner_id,
+            location=(stand.longitude, stand.latitude),
+            created_at=stand.created_at,
+            updated_at=stand.updated_at,
+            currency=stand.currency,
+            current_price_in_micros=stand.current_price_in_micros,
+            sales=sales[stand.id],
+        )
+        for stand in stands
+    ]
+
+
+def get_owners_lemonade_stands(owner_id, page_request: PageRequest) -> Page:
+    """Get a page of an owner's stands with their recent sales, as ``StandRow``s."""
+    page = paginate(
+        _owners_stand_rows_query(owner_id),
+        page_request=page_request,
+        order_by=[LemonadeStand.id],
+    )
+    return page._replace(items=_to_stand_rows(page.items))
+
+
+def get_owners_lemonade_stand_row(owner_id, stand_id) -> Optional[StandRow]:
+    """Get one of an owner's stands with its recent sales, as a ``StandRow``."""
+    stand = (
+        _owners_stand_rows_query(owner_id)
+        .filter(LemonadeStand.id == stand_id)
+        .one_or_none()
+    )
+    if stand is None:
+        return None
+
+    return _to_stand_rows([stand])[0]
 
 
 def get_owners_lemonade_stand_by_id(owner_id, stand_id) -> Optional[LemonadeStand]:
     return LemonadeStand.query.filter_by(owner_id=owner_id, id=stand_id).one_or_none()
 
 
-def get_lemonade_stand_sales_by_ids(
-    lemonade_stand_sale_ids: list[str],
-) -> list[LemonadeStandSale]:
-    return LemonadeStandSale.query.filter(
-        LemonadeStandSale.lemonade_stand_id.in_(lemonade_stand_sale_ids)
-    ).all()
+def get_lemonade_stands_near(
+    longitude: float,
+    latitude: float,
+    radius: float,
+    limit: int,
+) -> list[sqlalchemy.Row]:
+    """Get the stands nearest to a point, nearest first.
+
+    Answered from the near-me cache when it is enabled.
+
+    Parameters:
+        longitude: Longitude of the point.
+        latitude: Latitude of the point.
+        radius: Maximum distance in metres.
+        limit: Maximum number of stands to return.
+
+    Returns:
+        Rows of the stand ``id``, ``name``, ``current_price_in_micros``,
+        ``longitude``, ``latitude`` and ``distance`` in metres.
+    """
+    near_me_cache = services.near_me_cache.get_near_me_cache()
+    if near_me_cache is not None:
+        return near_me_cache.nearest(
+            longitude=longitude, latitude=latitude, radius=radius, limit=limit
+        )
+
+    return services.stand_search.find_lemonade_stands_near(
+        longitude=longitude, latitude=latitude, radius=radius, limit=limit
+    )
+
+
+# Sales are listed as read-only rows of these columns, skipping the cost of
+# building and tracking ORM objects that are serialized straight away.
+def _lemonade_stand_sales_query(stand_id):
+    return LemonadeStandSale.query.with_entities(*_SALE_ROW_COLUMNS).filter(
+        LemonadeStandSale.lemonade_stand_id == stand_id
+    )
+
+
+def _owners_lemonade_stand_sales_query(owner_id):
+    return (
+        LemonadeStandSale.query.with_entities(*_SALE_ROW_COLUMNS)
+        .join(LemonadeStandSale.lemonade_stand)
+        .filter(LemonadeStand.owner_id == owner_id)
+    )
+
+
+def _stream_sales(query) -> Iterable[sqlalchemy.Row]:
+    # yield_per fetches through a server side cursor, so only one batch of
+    # sales is in memory at a time.
+    return query.order_by(
+        LemonadeStandSale.date.desc(),
+        LemonadeStandSale.id.desc(),
+    ).yield_per(constants.STREAM_BATCH_SIZE)
+
+
+def get_lemonade_stand_sales(stand_id, page_request: PageRequest) -> Page:
+    """Get a page of a stand's sales, newest first."""
+    return paginate(
+        _lemonade_stand_sales_query(stand_id),
+        page_request=page_request,
+        order_by=[LemonadeStandSale.date, LemonadeStandSale.id],
+        descending=True,
+    )
+
+
+def stream_lemonade_stand_sales(stand_id) -> Iterable[sqlalchemy.Row]:
+    """Iterate over all of a stand's sales, newest first."""
+    return _stream_sales(_lemonade_stand_sales_query(stand_id))
+
+
+def get_owners_lemonade_stand_sales(owner_id, page_request: PageRequest) -> Page:
+    """Get a page of the sales of all of an owner's stands, newest first."""
+    return paginate(
+        _owners_lemonade_stand_sales_query(owner_id),
+        page_request=page_request,
+        order_by=[LemonadeStandSale.date, LemonadeStandSale.id],
+        descending=True,
+    )
+
+
+def stream_owners_lemonade_stand_sales(owner_id) -> Iterable[sqlalchemy.Row]:
+    """Iterate over all of the sales of all of an owner's stands, newest first."""
+    return _stream_sales(_owners_lemonade_stand_sales_query(owner_id))
+
+
+def insert_lemonade_stand_sales(sales: Sequence[Mapping[str, Any]]) -> None:
+    """Insert sales with one multi-row insert and add them to the daily sales rollup.
+
+    Runs in the current transaction.
+
+    Parameters:
+        sales: ``lemonade_stand_sale`` rows, of any stands.
+    """
+    if not sales:
+        return
+
+    db.session.execute(LemonadeStandSale.__table__.insert(), sales)
+    services.stats.record_daily_sales(sales)
+
+
+def add_lemonade_stand_sales(
+    stand: LemonadeStand,
+    sales: Sequence[BatchSaleRequest],
+) -> None:
+    """Add many sales to a stand, in the stand's currency.
+
+    Runs in the current transaction.
+
+    Parameters:
+        stand: The stand that made the sales.
+        sales: The validated sales.
+    """
+    insert_lemonade_stand_sales(
+        [
+            dict(
+                lemonade_stand_id=stand.id,
+                currency=stand.currency,
+                price_in_micros=sale.price_in_micros,
+                date=sale.date,
+            )
+            for sale in sales
+        ]
+    )
@@ -0,0 +1,76 @@
+from typing import Callable, NamedTuple
+
+import flask
+import sqlalchemy.orm
+
+from models import LemonadeStand
+
+
+class StandChanges(NamedTuple):
+    """Stands changed by a commit.
+
+    ``previous_locations`` holds the ``(longitude, latitude)`` the changed
+    stands had before the commit, when it was loaded.
+    """
+
+    stand_ids: frozenset[int]
+    previous_locations: list[tuple[float, float]]
+
+
+def add_stand_change_listener(
+    app: flask.Flask, listener: Callable[[StandChanges], None]
+) -> None:
+    """Call ``listener`` with the stands changed by each commit.
+
+    Parameters:
+        app: The flask app whose commits to listen to.
+        listener: Called after the commit, in the committing thread.
+    """
+    app.extensions.setdefault("stand_change_listeners", []).append(listener)
+
+
+@sqlalchemy.event.listens_for(sqlalchemy.orm.Session, "after_flush")
+def _track_stand_changes(session, flush_context) -> None:
+    # Selling lemonade dirties a stand's sales, not the stand itself.
+    dirty = (
+        instance
+        for instance in session.dirty
+        if session.is_modified(instance, include_collections=False)
+    )
+    stands = [
+        instance
+        for instance in (*session.new, *dirty, *session.deleted)
+        if isinstance(instance, LemonadeStand)
+    ]
+    if not stands:
+        return
+
+    stand_ids = session.info.setdefault("changed_stand_ids", set())
+    previous_locations = session.info.setdefault("previous_stand_locations", [])
+    for stand in stands:
+        stand_ids.add(stand.id)
+        # The coordinates are only reloaded after the commit, so loaded
+        # values are still those from before the change.
+        loaded = sqlalchemy.inspect(stand).dict
+        if "longitude" in loaded and "latitude" in loaded:
+            previous_locations.append((loaded["longitude"], loaded["latitude"]))
+
+
+@sqlalchemy.event.listens_for(sqlalchemy.orm.Session, "after_commit")
+def _notify_stand_changes(session) -> None:
+    stand_ids = session.info.pop("changed_stand_ids", None)
+    previous_locations = session.info.pop("previous_stand_locations", [])
+    if not stand_ids or not flask.has_app_context():
+        return
+
+    changes = StandChanges(
+        stand_ids=frozenset(stand_ids), previous_locations=previous_locations
+    )
+    for listener in flask.current_app.extensions.get("stand_change_listeners", []):
+        listener(changes)
+
+
+@sqlalchemy.event.listens_for(sqlalchemy.orm.Session, "after_rollback")
+def _forget_stand_changes(session) -> None:
+    session.info.pop("changed_stand_ids", None)
+    session.info.pop("previous_stand_locations", None)
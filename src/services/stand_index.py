@@ -0,0 +1,299 @@
+import heapq
+import math
+import threading
+import time
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+import flask
+
+import services.stand_changes
+from models import LemonadeStand, db
+
+# Radius of the sphere PostGIS measures geography distances on.
+EARTH_RADIUS = 6_371_008.7714  # metres
+
+
+class IndexedStand(NamedTuple):
+    id: int
+    name: str
+    longitude: float
+    latitude: float
+    current_price_in_micros: int
+
+
+class NearbyStand(NamedTuple):
+    id: int
+    name: str
+    current_price_in_micros: int
+    longitude: float
+    latitude: float
+    distance: float
+
+
+def distance_on_sphere(
+    longitude: float,
+    latitude: float,
+    other_longitude: float,
+    other_latitude: float,
+) -> float:
+    """Great circle distance in metres, like PostGIS on a sphere."""
+    phi = math.radians(latitude)
+    other_phi = math.radians(other_latitude)
+    half_chord = (
+        math.sin((other_phi - phi) / 2) ** 2
+        + math.cos(phi)
+        * math.cos(other_phi)
+        * math.sin(math.radians(other_longitude - longitude) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS * math.asin(min(1.0, math.sqrt(half_chord)))
+
+
+class StandSpatialIndex:
+    """An in-memory grid of every stand, to find stands near a point.
+
+    Stands are bucketed in cells of ``cell_size`` degrees.  A query only
+    looks at the cells overlapping its radius, and measures distances the
+    way PostGIS does on a sphere, so it returns the same stands as the
+    database.
+
+    Stands changed in this process are reloaded on the next query.  The
+    whole index is rebuilt once it is older than ``max_age`` seconds, to
+    pick up stands changed by other processes.
+
+    Parameters:
+        cell_size: Width and height of a grid cell in degrees.
+        max_age: Seconds before the index is rebuilt, ``0`` never rebuilds.
+    """
+
+    def __init__(self, cell_size: float, max_age: float):
+        self.cell_size = cell_size
+        self.max_age = max_age
+        self._columns = math.ceil(360 / cell_size)
+        self._rows = math.ceil(180 / cell_size)
+        self._stands: dict[int, IndexedStand] = {}
+        self._cells: dict[tuple[int, int], dict[int, IndexedStand]] = {}
+        self._loaded_at = 0.0
+        self._changed_ids: set[int] = set()
+        self._lock = threading.RLock()
+
+    def _cell(self, longitude: float, latitude: float) -> tuple[int, int]:
+        column = math.floor((longitude + 180) / self.cell_size) % self._columns
+        row = min(math.floor((latitude + 90) / self.cell_size), self._rows - 1)
+        return column, row
+
+    def _add(self, stand: IndexedStand) -> None:
+        self._remove(stand.id)
+        self._stands[stand.id] = stand
+        cell = self._cell(stand.longitude, stand.latitude)
+        self._cells.setdefault(cell, {})[stand.id] = stand
+
+    def _remove(self, stand_id: int) -> None:
+        stand = self._stands.pop(stand_id, None)
+        if stand is None:
+            return
+
+        cell = self._cell(stand.longitude, stand.latitude)
+        stands = self._cells[cell]
+        del stands[stand_id]
+        if not stands:
+            del self._cells[cell]
+
+    @staticmethod
+    def _query_stands(stand_ids: Optional[Iterable[int]] = None) -> list[IndexedStand]:
+        query = db.session.query(
+            LemonadeStand.id,
+            LemonadeStand.name,
+            LemonadeStand.longitude,
+            LemonadeStand.latitude,
+            LemonadeStand.current_price_in_micros,
+        )
+        if stand_ids is not None:
+            query = query.filter(LemonadeStand.id.in_(stand_ids))
+
+        return [IndexedStand(*row) for row in query]
+
+    def load(self) -> None:
+        """Rebuild the index from every stand in the database.
+
+        Needs an app context, whose session is used to query the stands.
+        """
+        stands = self._query_stands()
+
+        with self._lock:
+            self._stands = {}
+            self._cells = {}
+            for stand in stands:
+                self._add(stand)
+            self._loaded_at = time.monotonic()
+
+    def mark_changed(self, stand_ids: Iterable[int]) -> None:
+        """Reload the given stands on the next query."""
+        with self._lock:
+            self._changed_ids.update(stand_ids)
+
+    def _ensure_fresh(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            expired = self.max_age > 0 and now - self._loaded_at > self.max_age
+            if expired:
+                # Other threads keep using the current index while rebuilding.
+                self._loaded_at = now
+        if expired:
+            self.load()
+            return
+
+        with self._lock:
+            changed_ids, self._changed_ids = self._changed_ids, set()
+        if not changed_ids:
+            return
+
+        stands = self._query_stands(changed_ids)
+
+        with self._lock:
+            for stand_id in changed_ids:
+                self._remove(stand_id)
+            for stand in stands:
+                self._add(stand)
+
+    def _ring_offsets(
+        self, ring: int, half_columns: int, half_rows: int
+    ) -> Iterator[tuple[int, int]]:
+        if ring == 0:
+            yield 0, 0
+            return
+
+        for column_offset in range(-ring, ring + 1):
+            if abs(column_offset) <= half_columns:
+                for row_offset in (-ring, ring):
+                    if ring <= half_rows:
+                        yield column_offset, row_offset
+        for row_offset in range(-ring + 1, ring):
+            if abs(row_offset) <= half_rows:
+                for column_offset in (-ring, ring):
+                    if ring <= half_columns:
+                        yield column_offset, row_offset
+
+    def _rings(
+        self, longitude: float, latitude: float, radius: float
+    ) -> Iterator[tuple[list[dict[int, IndexedStand]], float]]:
+        """Yield the cells within reach of a point, ring by ring outwards.
+
+        Each ring comes with a distance that every stand within the radius
+        but in a later ring is at least as far away as.
+        """
+        span = math.degrees(radius / EARTH_RADIUS)
+        south = latitude - span
+        north = latitude + span
+        if south <= -90 or north >= 90:
+            # Every longitude is within reach of a pole.
+            yield list(self._cells.values()), math.inf
+            return
+
+        widest = math.cos(math.radians(max(abs(south), abs(north))))
+        half_columns = math.ceil(span / widest / self.cell_size) + 1
+        half_rows = math.ceil(span / self.cell_size) + 1
+        lookups = (2 * half_columns + 1) * (2 * half_rows + 1)
+        if 2 * half_columns + 1 >= self._columns or lookups >= len(self._stands):
+            # Looking at every stand is cheaper than looking up every cell.
+            yield list(self._cells.values()), math.inf
+            return
+
+        home_column, home_row = self._cell(longitude, latitude)
+        cos_latitude = math.cos(math.radians(latitude))
+        for ring in range(max(half_columns, half_rows) + 1):
+            ring_cells = []
+            for column_offset, row_offset in self._ring_offsets(
+                ring, half_columns, half_rows
+            ):
+                row = home_row + row_offset
+                if 0 <= row < self._rows:
+                    column = (home_column + column_offset) % self._columns
+                    stands = self._cells.get((column, row))
+                    if stands is not None:
+                        ring_cells.append(stands)
+
+            # Later rings are at least ``ring`` cells away in latitude or
+            # longitude, wherever the point is in its own cell.
+            gap = math.radians(ring * self.cell_size)
+            latitude_bound = EARTH_RADIUS * gap
+            longitude_bound = (
+                2
+                * EARTH_RADIUS
+                * math.asin(
+                    min(1.0, math.sqrt(cos_latitude * widest) * math.sin(gap / 2))
+                )
+            )
+            yield ring_cells, min(latitude_bound, longitude_bound)
+
+    def nearest(
+        self,
+        longitude: float,
+        latitude: float,
+        radius: float,
+        limit: int,
+    ) -> list[NearbyStand]:
+        """Get the stands nearest to a point, nearest first.
+
+        Cells are searched outwards from the point's own cell, stopping
+        once no unsearched cell can hold a stand nearer than the furthest
+        of the ``limit`` stands found so far.
+
+        Parameters:
+            longitude: Longitude of the point.
+            latitude: Latitude of the point.
+            radius: Maximum distance in metres.
+            limit: Maximum number of stands to return.
+        """
+        self._ensure_fresh()
+
+        # A max heap of the nearest stands found so far.
+        nearest: list[tuple[float, int, IndexedStand]] = []
+        with self._lock:
+            for ring_cells, bound in self._rings(longitude, latitude, radius):
+                for stands in ring_cells:
+                    for stand in stands.values():
+                        distance = distance_on_sphere(
+                            longitude, latitude, stand.longitude, stand.latitude
+                        )
+                        if distance > radius:
+                            continue
+                        if len(nearest) < limit:
+                            heapq.heappush(nearest, (-distance, -stand.id, stand))
+                        elif -distance > nearest[0][0]:
+                            heapq.heapreplace(nearest, (-distance, -stand.id, stand))
+
+                if len(nearest) == limit and -nearest[0][0] <= bound:
+                    break
+
+        return [
+            NearbyStand(
+                id=stand.id,
+                name=stand.name,
+                current_price_in_micros=stand.current_price_in_micros,
+                longitude=stand.longitude,
+                latitude=stand.latitude,
+                distance=-negative_distance,
+            )
+            for negative_distance, _, stand in sorted(nearest, reverse=True)
+        ]
+
+
+def init_app(app: flask.Flask) -> None:
+    """Build the stand spatial index for the app, if ``STAND_INDEX_ENABLED``."""
+    if not app.config["STAND_INDEX_ENABLED"]:
+        return
+
+    index = StandSpatialIndex(
+        cell_size=app.config["STAND_INDEX_CELL_SIZE"],
+        max_age=app.config["STAND_INDEX_MAX_AGE"],
+    )
+    with app.app_context():
+        index.load()
+    services.stand_changes.add_stand_change_listener(
+        app, lambda changes: index.mark_changed(changes.stand_ids)
+    )
+    app.extensions["stand_index"] = index
+
+
+def get_stand_index() -> Optional[StandSpatialIndex]:
+    return flask.current_app.extensions.get("stand_index")
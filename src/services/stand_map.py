@@ -0,0 +1,214 @@
+import math
+import threading
+from typing import Optional
+
+import flask
+import sqlalchemy
+from sqlalchemy import func
+
+import constants
+import services.stand_changes
+from cache import TTLCache
+from models import LemonadeStand, db
+
+# Vector tiles are 4096 units wide, as ST_AsMVTGeom defaults to.
+TILE_EXTENT = 4096
+TILE_MIMETYPE = "application/vnd.mapbox-vector-tile"
+
+_location_geometry = func.geometry(LemonadeStand.location)
+
+
+def _single(column):
+    """The column's value for a cluster of one stand, otherwise null."""
+    return sqlalchemy.case((func.count() == 1, func.min(column)))
+
+
+def get_stand_clusters(
+    west: float,
+    south: float,
+    east: float,
+    north: float,
+    zoom: int,
+) -> list[sqlalchemy.Row]:
+    """Get the stands in a bounding box, clustered for a map zoom level.
+
+    Stands are grouped on a grid of ``MAP_CLUSTER_CELLS_PER_TILE`` cells
+    across each web map tile at ``zoom``, so a viewport gets a similar
+    number of clusters at every zoom level.
+
+    Parameters:
+        west: Minimum longitude.
+        south: Minimum latitude.
+        east: Maximum longitude.
+        north: Maximum latitude.
+        zoom: Web map zoom level.
+
+    Returns:
+        Rows of the cluster ``longitude``, ``latitude`` and ``count``.  A
+        cluster of one stand also has the stand's ``id``, ``name``,
+        ``current_price_in_micros`` and ``currency``, which are ``None``
+        for larger clusters.
+    """
+    cell_size = 360 / 2**zoom / constants.MAP_CLUSTER_CELLS_PER_TILE
+    column = func.floor(LemonadeStand.longitude / cell_size)
+    row = func.floor(LemonadeStand.latitude / cell_size)
+    return db.session.execute(
+        sqlalchemy.select(
+            func.avg(LemonadeStand.longitude).label("longitude"),
+            func.avg(LemonadeStand.latitude).label("latitude"),
+            func.count().label("count"),
+            _single(LemonadeStand.id).label("id"),
+            _single(LemonadeStand.name).label("name"),
+            _single(LemonadeStand.current_price_in_micros).label(
+                "current_price_in_micros"
+            ),
+            _single(LemonadeStand.currency).label("currency"),
+        )
+        .where(
+            _location_geometry.op("&&")(
+                func.ST_MakeEnvelope(west, south, east, north, 4326)
+            )
+        )
+        .group_by(column, row)
+    ).all()
+
+
+def _render_stand_tile(z: int, x: int, y: int) -> bytes:
+    envelope = func.ST_TileEnvelope(z, x, y)
+    tile_geometry = func.ST_AsMVTGeom(
+        func.ST_Transform(_location_geometry, 3857), envelope, TILE_EXTENT
+    )
+    features = (
+        sqlalchemy.select(
+            func.ST_Centroid(func.ST_Collect(tile_geometry)).label("geom"),
+            func.count().label("point_count"),
+            _single(LemonadeStand.id).label("id"),
+            _single(LemonadeStand.name).label("name"),
+            _single(LemonadeStand.current_price_in_micros).label(
+                "current_price_in_micros"
+            ),
+            _single(LemonadeStand.currency).label("currency"),
+        )
+        .where(_location_geometry.op("&&")(func.ST_Transform(envelope, 4326)))
+        .group_by(func.ST_SnapToGrid(tile_geometry, constants.TILE_CLUSTER_SIZE))
+        .subquery("features")
+    )
+    tile = db.session.execute(
+        sqlalchemy.select(func.ST_AsMVT(features.table_valued(), "stands"))
+    ).scalar()
+    return bytes(tile or b"")
+
+
+def tiles_at(longitude: float, latitude: float) -> list[tuple[int, int, int]]:
+    """Get the ``(z, x, y)`` of the tile holding a point at every zoom level."""
+    latitude = max(-85.0511, min(85.0511, latitude))
+    mercator_y = math.asinh(math.tan(math.radians(latitude)))
+    tiles = []
+    for z in range(constants.MAX_TILE_ZOOM + 1):
+        size = 2**z
+        x = min(size - 1, int((longitude + 180) / 360 * size))
+        y = min(size - 1, int((1 - mercator_y / math.pi) / 2 * size))
+        tiles.append((z, x, y))
+    return tiles
+
+
+class StandTileCache:
+    """Cache rendered stand tiles by ``(z, x, y)``.
+
+    When a stand changes, the tiles holding its previous and new location
+    at every zoom level are evicted before the next tile is served.  Stands
+    changed by other processes are only seen once a tile is older than
+    ``ttl``, which is why the cache is off unless ``STAND_TILE_CACHE_SIZE``
+    is set.
+
+    Parameters:
+        maxsize: Maximum number of cached tiles.
+        ttl: Seconds a tile is used for.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._tiles = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._changed_ids: set[int] = set()
+        self._previous_locations: list[tuple[float, float]] = []
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def mark_changed(self, changes: services.stand_changes.StandChanges) -> None:
+        """Evict the tiles that changed stands were or are in on the next lookup."""
+        with self._lock:
+            self._changed_ids.update(changes.stand_ids)
+            self._previous_locations.extend(changes.previous_locations)
+            self._generation += 1
+
+    def _evict_changed(self) -> None:
+        with self._lock:
+            changed_ids, self._changed_ids = self._changed_ids, set()
+            locations, self._previous_locations = self._previous_locations, []
+        if not changed_ids:
+            return
+
+        # Looked up in the session of the request being answered.
+        locations.extend(
+            db.session.execute(
+                sqlalchemy.select(
+                    LemonadeStand.longitude, LemonadeStand.latitude
+                ).where(LemonadeStand.id.in_(changed_ids))
+            ).all()
+        )
+
+        for longitude, latitude in locations:
+            for tile in tiles_at(longitude, latitude):
+                self._tiles.pop(tile)
+
+    def get(self, z: int, x: int, y: int) -> bytes:
+        """Get a tile, rendering it on a miss."""
+        self._evict_changed()
+
+        tile = self._tiles.get((z, x, y))
+        if tile is None:
+            generation = self._generation
+            tile = _render_stand_tile(z, x, y)
+            # Stands changed while rendering may be missing from the tile.
+            if generation == self._generation:
+                self._tiles.set((z, x, y), tile)
+        return tile
+
+
+def init_app(app: flask.Flask) -> None:
+    """Create the stand tile cache for the app.
+
+    The cache is disabled when ``STAND_TILE_CACHE_SIZE`` is ``0``, the default.
+    """
+    if app.config["STAND_TILE_CACHE_SIZE"] <= 0:
+        return
+
+    tile_cache = StandTileCache(
+        maxsize=app.config["STAND_TILE_CACHE_SIZE"],
+        ttl=app.config["STAND_TILE_CACHE_TTL"],
+    )
+    services.stand_changes.add_stand_change_listener(app, tile_cache.mark_changed)
+    app.extensions["stand_tile_cache"] = tile_cache
+
+
+def get_stand_tile_cache() -> Optional[StandTileCache]:
+    return flask.current_app.extensions.get("stand_tile_cache")
+
+
+def get_stand_tile(z: int, x: int, y: int) -> bytes:
+    """Get a Mapbox Vector Tile of the stands in a web map tile.
+
+    The tile has one ``stands`` layer of points.  Stands close together
+    at the tile's zoom level are clustered into one point with a
+    ``point_count``, and a point of a single stand has its ``id``,
+    ``name``, ``current_price_in_micros`` and ``currency``.
+
+    Parameters:
+        z: Zoom level.
+        x: Column of the tile.
+        y: Row of the tile, from the top.
+    """
+    tile_cache = get_stand_tile_cache()
+    if tile_cache is not None:
+        return tile_cache.get(z, x, y)
+
+    return _render_stand_tile(z, x, y)
@@ -0,0 +1,160 @@
+from typing import Sequence
+
+import sqlalchemy
+from geoalchemy2 import Geography
+
+import services.stand_index
+from models import LemonadeStand, db
+
+
+def find_lemonade_stands_near(
+    longitude: float,
+    latitude: float,
+    radius: float,
+    limit: int,
+) -> list[sqlalchemy.Row]:
+    """Find the stands nearest to a point, nearest first, without caching.
+
+    Uses the in-memory stand index when it is enabled.  Otherwise the GiST
+    index on ``LemonadeStand.location`` serves both the radius filter and
+    the ``<->`` nearest neighbour ordering, so only ``limit`` index entries
+    are visited however many stands there are.
+
+    Parameters:
+        longitude: Longitude of the point.
+        latitude: Latitude of the point.
+        radius: Maximum distance in metres.
+        limit: Maximum number of stands to return.
+    """
+    stand_index = services.stand_index.get_stand_index()
+    if stand_index is not None:
+        return stand_index.nearest(
+            longitude=longitude, latitude=latitude, radius=radius, limit=limit
+        )
+
+    return _get_lemonade_stands_near_from_database(
+        longitude=longitude, latitude=latitude, radius=radius, limit=limit
+    )
+
+
+def _get_lemonade_stands_near_from_database(
+    longitude: float,
+    latitude: float,
+    radius: float,
+    limit: int,
+) -> list[sqlalchemy.Row]:
+    point = sqlalchemy.cast(
+        sqlalchemy.func.ST_SetSRID(
+            sqlalchemy.func.ST_MakePoint(longitude, latitude), 4326
+        ),
+        Geography(srid=4326),
+    )
+    return (
+        LemonadeStand.query.with_entities(
+            LemonadeStand.id,
+            LemonadeStand.name,
+            LemonadeStand.current_price_in_micros,
+            LemonadeStand.longitude,
+            LemonadeStand.latitude,
+            # Measured on the sphere, like the <-> ordering.
+            sqlalchemy.func.ST_Distance(LemonadeStand.location, point, False).label(
+                "distance"
+            ),
+        )
+        .filter(
+            sqlalchemy.func.ST_DWithin(LemonadeStand.location, point, radius, False)
+        )
+        .order_by(LemonadeStand.location.distance_centroid(point))
+        .limit(limit)
+        .all()
+    )
+
+
+def find_lemonade_stands_near_points(
+    points: Sequence[tuple[float, float]],
+    radius: float,
+    limit: int,
+) -> list[list[sqlalchemy.Row]]:
+    """Find the stands nearest to each of several points, without caching.
+
+    Uses the in-memory stand index when it is enabled.  Otherwise every
+    point is looked up in one query, joining the points to a ``LATERAL``
+    nearest neighbour subquery, so the database does one round trip and
+    one index scan per point.  The near-me cache is skipped, as each of
+    its misses would be a query of its own.
+
+    Parameters:
+        points: ``(longitude, latitude)`` of each point.
+        radius: Maximum distance in metres.
+        limit: Maximum number of stands to return per point.
+
+    Returns:
+        The stands near each point, in the order of ``points``, as rows like
+        ``find_lemonade_stands_near`` returns.
+    """
+    stand_index = services.stand_index.get_stand_index()
+    if stand_index is not None:
+        return [
+            stand_index.nearest(
+                longitude=longitude, latitude=latitude, radius=radius, limit=limit
+            )
+            for longitude, latitude in points
+        ]
+
+    return _get_lemonade_stands_near_points_from_database(
+        points=points, radius=radius, limit=limit
+    )
+
+
+def _get_lemonade_stands_near_points_from_database(
+    points: Sequence[tuple[float, float]],
+    radius: float,
+    limit: int,
+) -> list[list[sqlalchemy.Row]]:
+    point_values = sqlalchemy.values(
+        sqlalchemy.column("point_index", sqlalchemy.Integer),
+        sqlalchemy.column("longitude", sqlalchemy.Float),
+        sqlalchemy.column("latitude", sqlalchemy.Float),
+        name="points",
+    ).data(
+        [
+            (index, longitude, latitude)
+            for index, (longitude, latitude) in enumerate(points)
+        ]
+    )
+    point = sqlalchemy.cast(
+        sqlalchemy.func.ST_SetSRID(
+            sqlalchemy.func.ST_MakePoint(
+                point_values.c.longitude, point_values.c.latitude
+            ),
+            4326,
+        ),
+        Geography(srid=4326),
+    )
+    nearest = (
+        sqlalchemy.select(
+            LemonadeStand.id,
+            LemonadeStand.name,
+            LemonadeStand.current_price_in_micros,
+            LemonadeStand.longitude.label("longitude"),
+            LemonadeStand.latitude.label("latitude"),
+            sqlalchemy.func.ST_Distance(LemonadeStand.location, point, False).label(
+                "distance"
+            ),
+        )
+        .where(sqlalchemy.func.ST_DWithin(LemonadeStand.location, point, radius, False))
+        .order_by(LemonadeStand.location.distance_centroid(point))
+        .limit(limit)
+        .lateral("nearest")
+    )
+    rows = db.session.execute(
+        sqlalchemy.select(point_values.c.point_index, nearest)
+        .select_from(point_values)
+        .join(nearest, sqlalchemy.true())
+        .order_by(point_values.c.point_index, nearest.c.distance)
+    )
+
+    stands = [[] for _ in points]
+    for row in rows:
+        stands[row.point_index].append(row)
+    return stands
@@ -0,0 +1,154 @@
+import datetime
+from typing import Any, Iterable, Mapping, NamedTuple
+
+import sqlalchemy
+from sqlalchemy.dialects.postgresql import insert
+
+from models import LemonadeStandDailySales, LemonadeStandSale, db
+
+
+class SalesTotal(NamedTuple):
+    currency: str
+    sales_count: int
+    revenue_in_micros: int
+
+
+def _utc_day(date: datetime.datetime) -> datetime.date:
+    return date.astimezone(datetime.timezone.utc).date()
+
+
+def record_daily_sales(sales: Iterable[Mapping[str, Any]]) -> None:
+    """Add sales to the daily sales rollup.
+
+    Runs in the current transaction, so the rollup is committed together
+    with the sales.  Sales are summed per stand, day and currency first,
+    so every row of the rollup is only written once.
+
+    Parameters:
+        sales: Newly made ``lemonade_stand_sale`` rows.
+    """
+    rollup: dict[tuple[int, datetime.date, str], list[int]] = {}
+    for sale in sales:
+        key = (sale["lemonade_stand_id"], _utc_day(sale["date"]), sale["currency"])
+        totals = rollup.setdefault(key, [0, 0])
+        totals[0] += 1
+        totals[1] += sale["price_in_micros"]
+
+    if not rollup:
+        return
+
+    statement = insert(LemonadeStandDailySales).values(
+        [
+            dict(
+                lemonade_stand_id=stand_id,
+                day=day,
+                currency=currency,
+                sales_count=sales_count,
+                revenue_in_micros=revenue_in_micros,
+            )
+            for (stand_id, day, currency), (
+                sales_count,
+                revenue_in_micros,
+            ) in rollup.items()
+        ]
+    )
+    # Incrementing in the database keeps concurrent sales from losing updates.
+    db.session.execute(
+        statement.on_conflict_do_update(
+            index_elements=[
+                LemonadeStandDailySales.lemonade_stand_id,
+                LemonadeStandDailySales.day,
+                LemonadeStandDailySales.currency,
+            ],
+            set_=dict(
+                sales_count=LemonadeStandDailySales.sales_count
+                + statement.excluded.sales_count,
+                revenue_in_micros=LemonadeStandDailySales.revenue_in_micros
+                + statement.excluded.revenue_in_micros,
+            ),
+        )
+    )
+
+
+def rebuild_daily_sales(stand_id) -> None:
+    """Recalculate a stand's daily sales rollup from all of its sales.
+
+    Runs in the current transaction.
+
+    Parameters:
+        stand_id: Id of the stand.
+    """
+    day = sqlalchemy.cast(
+        sqlalchemy.func.timezone("UTC", LemonadeStandSale.date), sqlalchemy.Date
+    )
+    db.session.execute(
+        sqlalchemy.delete(LemonadeStandDailySales)
+        .where(LemonadeStandDailySales.lemonade_stand_id == stand_id)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.execute(
+        insert(LemonadeStandDailySales).from_select(
+            [
+                LemonadeStandDailySales.lemonade_stand_id,
+                LemonadeStandDailySales.day,
+                LemonadeStandDailySales.currency,
+                LemonadeStandDailySales.sales_count,
+                LemonadeStandDailySales.revenue_in_micros,
+            ],
+            sqlalchemy.select(
+                LemonadeStandSale.lemonade_stand_id,
+                day,
+                LemonadeStandSale.currency,
+                sqlalchemy.func.count(),
+                sqlalchemy.func.sum(LemonadeStandSale.price_in_micros),
+            )
+            .where(LemonadeStandSale.lemonade_stand_id == stand_id)
+            .group_by(
+                LemonadeStandSale.lemonade_stand_id, day, LemonadeStandSale.currency
+            ),
+        )
+    )
+
+
+def get_daily_sales(
+    stand_id,
+    start_day: datetime.date,
+    end_day: datetime.date,
+) -> list[LemonadeStandDailySales]:
+    """Get a stand's sales per day and currency, oldest first.
+
+    Days without sales are left out.
+
+    Parameters:
+        stand_id: Id of the stand.
+        start_day: First UTC day to include.
+        end_day: Last UTC day to include.
+    """
+    return (
+        LemonadeStandDailySales.query.filter(
+            LemonadeStandDailySales.lemonade_stand_id == stand_id,
+            LemonadeStandDailySales.day.between(start_day, end_day),
+        )
+        .order_by(LemonadeStandDailySales.day, LemonadeStandDailySales.currency)
+        .all()
+    )
+
+
+def get_sales_totals(
+    daily_sales: Iterable[LemonadeStandDailySales],
+) -> list[SalesTotal]:
+    """Sum daily sales per currency."""
+    totals: dict[str, list[int]] = {}
+    for row in daily_sales:
+        total = totals.setdefault(row.currency, [0, 0])
+        total[0] += row.sales_count
+        total[1] += row.revenue_in_micros
+
+    return [
+        SalesTotal(
+            currency=currency,
+            sales_count=sales_count,
+            revenue_in_micros=revenue_in_micros,
+        )
+        for currency, (sales_count, revenue_in_micros) in sorted(totals.items())
+    ]
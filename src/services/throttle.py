@@ -0,0 +1,102 @@
+import collections
+import threading
+import time
+from typing import Hashable
+
+import flask
+
+from exceptions import TooManyRequestsError
+
+
+class TokenBucketLimiter:
+    """An in-memory token bucket per key.
+
+    Each key may make ``burst`` calls at once, and earns ``rate`` more
+    calls per second after that.  Only the ``max_keys`` most recently used
+    keys are tracked, so memory stays bounded when many keys are seen.
+
+    Parameters:
+        rate: Tokens added to a bucket per second.
+        burst: Size of each bucket.
+        max_keys: Maximum number of buckets to keep.
+    """
+
+    def __init__(self, rate: float, burst: int, max_keys: int):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: collections.OrderedDict[Hashable, tuple[float, float]] = (
+            collections.OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def allow(self, key: Hashable) -> bool:
+        """Take a token from the bucket for ``key`` if one is available."""
+        return self._update(key, take=True)
+
+    def peek(self, key: Hashable) -> bool:
+        """Check if the bucket for ``key`` has a token, without taking it."""
+        return self._update(key, take=False)
+
+    def _update(self, key: Hashable, take: bool) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated_at) * self.rate)
+            allowed = tokens >= 1
+            if allowed and take:
+                tokens -= 1
+
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+
+        return allowed
+
+
+def init_app(app: flask.Flask) -> None:
+    """Set up the login throttles for the app."""
+    app.extensions["login_ip_throttle"] = TokenBucketLimiter(
+        rate=app.config["LOGIN_IP_THROTTLE_RATE"],
+        burst=app.config["LOGIN_IP_THROTTLE_BURST"],
+        max_keys=app.config["LOGIN_THROTTLE_MAX_KEYS"],
+    )
+    app.extensions["login_email_throttle"] = TokenBucketLimiter(
+        rate=app.config["LOGIN_EMAIL_THROTTLE_RATE"],
+        burst=app.config["LOGIN_EMAIL_THROTTLE_BURST"],
+        max_keys=app.config["LOGIN_THROTTLE_MAX_KEYS"],
+    )
+
+
+def throttle_login(ip_address: str, email: str) -> None:
+    """Reject login attempts from callers that are trying too often.
+
+    Every attempt counts against the ip address.  Only failed attempts count
+    against the email, see ``record_failed_login``, and only from the same ip
+    address, so nobody can lock a user out by failing to log in as them from
+    elsewhere.
+
+    Parameters:
+        ip_address: String version of the callers ip address.
+        email: The email the caller is trying to log in as.
+
+    Raises:
+        TooManyRequestsError: If either the ip address or email is over its limit.
+    """
+    extensions = flask.current_app.extensions
+    if not extensions["login_ip_throttle"].allow(ip_address):
+        raise TooManyRequestsError()
+
+    if not extensions["login_email_throttle"].peek((ip_address, email)):
+        raise TooManyRequestsError()
+
+
+def record_failed_login(ip_address: str, email: str) -> None:
+    """Count a failed login attempt against the email.
+
+    Parameters:
+        ip_address: String version of the callers ip address.
+        email: The email the caller failed to log in as.
+    """
+    flask.current_app.extensions["login_email_throttle"].allow((ip_address, email))
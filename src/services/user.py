@@ -1,11 +1,12 @@
 import datetime
 from typing import Optional
 
-import werkzeug.security
-
 from exceptions import ServerError
 from models import Role, User, db
+from pagination import Page, PageRequest, paginate
 import pydantic
+import services.password
+import services.permission
 
 
 def get_user_by_id(id: int) -> Optional[User]:
@@ -16,8 +17,15 @@ def get_user_by_email(email: str) -> Optional[User]:
     return User.query.filter_by(email=email).one_or_none()
 
 
-def get_all_users() -> list[User]:
-    return User.query.all()
+def get_all_users(page_request: PageRequest) -> Page:
+    """Get a page of users, as read-only rows of the columns users are listed with."""
+    return paginate(
+        User.query.with_entities(
+            User.id, User.email, User.first_name, User.last_name, User.age
+        ),
+        page_request=page_request,
+        order_by=[User.id],
+    )
 
 
 def create_user(
@@ -26,10 +34,10 @@ def create_user(
     last_name: str,
     age: int,
     password: pydantic.SecretStr,
-    roles: list[Role] | None
+    roles: list[Role] | None = None,
 ) -> None:
     roles = roles or list()
-    password_hash = werkzeug.security.generate_password_hash(
+    password_hash = services.password.generate_password_hash(
         password.get_secret_value()
     )
 
@@ -55,9 +63,6 @@ def create_user(
 
 
 def get_permissions_for_user(user: User) -> list[str]:
-    permissions = []
-    for role in user.roles:
-        for permission in role.permissions:
-            permissions.append(permission.name)
-
-    return permissions
+    return sorted(
+        services.permission.get_permissions_for_roles(role.id for role in user.roles)
+    )
@@ -1,3 +1,88 @@
 from dotenv import load_dotenv
 
 load_dotenv("../.env.test", verbose=True)  # take environment variables from .env.
+import os
+import unittest
+import uuid
+from unittest import mock
+
+import flask
+import flask.testing
+
+import services.janitor
+import services.last_seen
+
+
+def get_app(test: unittest.TestCase, **environ: str) -> flask.Flask:
+    """Create an app for a test, with ``environ`` added to the environment.
+
+    The app's last seen buffer, token janitor and password hashing workers
+    are stopped when the test is done.
+    """
+    # Imported here, as importing app creates an app, which needs the
+    # database, and tests of single modules should not.
+    from app import create_app
+
+    with mock.patch.dict(os.environ, environ):
+        app = create_app()
+
+    test.addCleanup(services.last_seen.stop, app)
+    test.addCleanup(services.janitor.stop, app)
+    test.addCleanup(app.extensions["password_hasher"].shutdown)
+    return app
+
+
+def create_user(client: flask.testing.FlaskClient, name: str) -> dict[str, str]:
+    """Create a user with a unique email and log in as them.
+
+    Emails are unique per call, so tests can be rerun against the same
+    database.
+
+    Parameters:
+        client: The test client.
+        name: Used in the user's email and names.
+
+    Returns:
+        The headers authorizing requests as the user.
+    """
+    email = f"{name.replace(' ', '.')}.{uuid.uuid4().hex[:12]}@lemonademail.com"
+    response = client.post(
+        "/users",
+        json=dict(
+            email=email,
+            password="password",
+            first_name=name,
+            last_name="test",
+            age=99,
+        ),
+    )
+    assert response.status_code == 201, response.json
+    response = client.post("/auth/login", json=dict(email=email, password="password"))
+    assert response.status_code == 201, response.json
+    return {"Authorization": f"Bearer {response.json['accessToken']}"}
+
+
+def create_stand(
+    client: flask.testing.FlaskClient,
+    headers: dict[str, str],
+    name: str,
+    longitude: float = 13.002804,
+    latitude: float = 55.594707,
+) -> int:
+    """Create a stand selling in USD for the user of ``headers``.
+
+    Returns:
+        The id of the new stand.
+    """
+    response = client.post(
+        "/my/stands",
+        json=dict(
+            name=name,
+            location=[longitude, latitude],
+            currency="USD",
+            currentPriceInMicros=1_000_000,
+        ),
+        headers=headers,
+    )
+    assert response.status_code == 201, response.json
+    return client.get(response.headers["Location"], headers=headers).json["id"]
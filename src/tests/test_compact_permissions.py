@@ -0,0 +1,73 @@
+import unittest
+import uuid
+
+import flask
+import jwt
+
+import services.auth
+import services.permission
+import services.user
+from models import db
+from serialization import TokenPair
+from tests import create_user, get_app
+
+
+class TestCompactPermissions(unittest.TestCase):
+    def resign(self, app: flask.Flask, headers: dict[str, str], **claims) -> dict:
+        """Sign and register a copy of an access token with other claims."""
+        access_token = headers["Authorization"].split()[1]
+        with app.test_request_context():
+            payload = jwt.decode(access_token, options=dict(verify_signature=False))
+            payload.update(claims, jwtid=str(uuid.uuid4()))
+            token = jwt.encode(
+                payload,
+                key=app.config["SECRET_KEY"],
+                algorithm=app.config["JWT_ALGORITHM"],
+            )
+            services.auth.register_token_pair_creation_for_user(
+                user=services.user.get_user_by_id(id=payload["sub"]),
+                ip_address="",
+                user_agent="",
+                token_pair=TokenPair(
+                    access_token=token,
+                    refresh_token=services.auth.create_refresh_token_for_user(
+                        payload["sub"]
+                    ),
+                ),
+            )
+            db.session.commit()
+        return {"Authorization": f"Bearer {token}"}
+
+    def test_permissions_are_checked_from_the_bitset(self):
+        app = get_app(self, JWT_COMPACT_PERMISSIONS="true")
+        with app.test_client() as client:
+            headers = create_user(client, "compact permissions")
+
+            claims = jwt.decode(
+                headers["Authorization"].split()[1],
+                options=dict(verify_signature=False),
+            )
+            self.assertNotIn("roles", claims)
+            with app.app_context():
+                self.assertEqual(
+                    claims["perms_version"],
+                    services.permission.get_role_permission_cache().registry_version,
+                )
+
+            me_url = flask.url_for("users.get_me")
+            response = client.get(me_url, headers=headers)
+            self.assertEqual(response.status_code, 200)
+
+            # Users are not admins.
+            response = client.get(flask.url_for("users.get_all_users"), headers=headers)
+            self.assertEqual(response.status_code, 403)
+
+            # The same bitset is accepted for the current registry version,
+            # and rejected for any other, whose bits may mean other things.
+            current = self.resign(app, headers, perms_version=claims["perms_version"])
+            response = client.get(me_url, headers=current)
+            self.assertEqual(response.status_code, 200)
+
+            stale = self.resign(app, headers, perms_version="00000000")
+            response = client.get(me_url, headers=stale)
+            self.assertEqual(response.status_code, 401)
@@ -0,0 +1,65 @@
+import gzip
+import unittest
+
+import flask
+
+import compression
+
+
+def get_app():
+    app = flask.Flask(__name__)
+    app.config["COMPRESSION_MIN_SIZE"] = 100
+    compression.init_app(app)
+
+    @app.route("/large")
+    def large():
+        return flask.jsonify([dict(priceInMicros=i) for i in range(500)])
+
+    @app.route("/small")
+    def small():
+        return flask.jsonify(dict(priceInMicros=1))
+
+    @app.route("/stream")
+    def stream():
+        def generate():
+            for i in range(3):
+                yield f'{{"priceInMicros": {i}}}\n'
+
+        return flask.Response(generate(), mimetype="application/x-ndjson")
+
+    return app
+
+
+class TestCompression(unittest.TestCase):
+    def test_large_responses_are_compressed(self):
+        with get_app().test_client() as client:
+            response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+            self.assertEqual(response.headers["Content-Encoding"], "gzip")
+            self.assertIn("Accept-Encoding", response.headers["Vary"])
+            self.assertEqual(
+                int(response.headers["Content-Length"]), len(response.data)
+            )
+            self.assertEqual(len(flask.json.loads(gzip.decompress(response.data))), 500)
+
+            response = client.get("/large")
+            self.assertNotIn("Content-Encoding", response.headers)
+            self.assertIn("Accept-Encoding", response.headers["Vary"])
+
+            response = client.get("/large", headers={"Accept-Encoding": "gzip;q=0"})
+            self.assertNotIn("Content-Encoding", response.headers)
+
+    def test_small_responses_are_not_compressed(self):
+        with get_app().test_client() as client:
+            response = client.get("/small", headers={"Accept-Encoding": "gzip"})
+            self.assertNotIn("Content-Encoding", response.headers)
+            self.assertEqual(response.json, dict(priceInMicros=1))
+
+    def test_streamed_responses_are_compressed(self):
+        with get_app().test_client() as client:
+            response = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+            self.assertEqual(response.headers["Content-Encoding"], "gzip")
+            self.assertNotIn("Content-Length", response.headers)
+            self.assertEqual(
+                gzip.decompress(response.data).decode().splitlines(),
+                [f'{{"priceInMicros": {i}}}' for i in range(3)],
+            )
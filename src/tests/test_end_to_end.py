@@ -78,7 +78,7 @@ class TestEndToEnd(unittest.TestCase):
                 "/my/stands",
                 json=dict(
                     name="test stand",
-                    location=[stand_lat, stand_lon],
+                    location=[stand_lon, stand_lat],
                     currency="USD",
                     currentPriceInMicros=1_000_000,
                 ),
@@ -131,18 +131,20 @@ class TestEndToEnd(unittest.TestCase):
                     "stands.get_stands_near_me",
                     latitude=stand_lat + 0.1,
                     longitude=stand_lon + 0.1,
+                    radius=15_000,
                 ),
             )
             self.assertEqual(response.status_code, 200)
             self.assertEqual(len(response.json), 1)
             print(response.json)
 
-            # does not return stands that are too far away
+            # does not return stands that are too far away, about 19 km
             response = client.get(
                 flask.url_for(
                     "stands.get_stands_near_me",
                     latitude=55.710648,
                     longitude=13.232055,
+                    radius=15_000,
                 ),
             )
             self.assertEqual(response.status_code, 200)
@@ -0,0 +1,47 @@
+import datetime
+import unittest
+
+import flask
+import sqlalchemy
+
+from models import AccessToken, RefreshToken, db
+from services.janitor import TokenJanitor
+from tests import create_user, get_app
+
+
+class TestTokenJanitor(unittest.TestCase):
+    def test_run_once_purges_tokens_expired_before_the_retention(self):
+        app = get_app(self)
+        with app.test_client() as client:
+            expired_user_id = client.get(
+                flask.url_for("users.get_me"), headers=create_user(client, "expired")
+            ).json["id"]
+            current_user_id = client.get(
+                flask.url_for("users.get_me"), headers=create_user(client, "current")
+            ).json["id"]
+
+        # Expired an hour longer ago than the janitor keeps tokens.
+        expiration = datetime.datetime.now(tz=datetime.timezone.utc)
+        expiration -= datetime.timedelta(hours=2)
+        models = (AccessToken, RefreshToken)
+        with app.app_context():
+            for model in models:
+                db.session.execute(
+                    sqlalchemy.update(model)
+                    .where(model.user_id == expired_user_id)
+                    .values(expiration=expiration)
+                )
+            db.session.commit()
+
+        janitor = TokenJanitor(app=app, interval=60, retention=60 * 60, batch_size=1)
+        purged = janitor.run_once()
+
+        with app.app_context():
+            for model in models:
+                self.assertGreaterEqual(purged[model.__tablename__], 1)
+                self.assertEqual(
+                    model.query.filter_by(user_id=expired_user_id).count(), 0
+                )
+                self.assertEqual(
+                    model.query.filter_by(user_id=current_user_id).count(), 1
+                )
@@ -0,0 +1,22 @@
+import unittest
+
+import flask
+
+import services.last_seen
+
+
+class TestLastSeenBuffer(unittest.TestCase):
+    def test_init_app_is_idempotent_and_stop_ends_the_thread(self):
+        app = flask.Flask(__name__)
+        app.config.update(LAST_SEEN_FLUSH_INTERVAL=60, LAST_SEEN_BUFFER_SIZE=100)
+
+        services.last_seen.init_app(app)
+        buffer = app.extensions["last_seen_buffer"]
+        services.last_seen.init_app(app)
+        self.assertIs(app.extensions["last_seen_buffer"], buffer)
+        self.assertTrue(buffer._thread.is_alive())
+
+        services.last_seen.stop(app)
+        self.assertFalse(buffer._thread.is_alive())
+        # Stopping twice is harmless.
+        services.last_seen.stop(app)
@@ -0,0 +1,64 @@
+import json
+import unittest
+from unittest import mock
+
+import flask
+
+import constants
+from tests import create_stand, create_user, get_app
+
+NDJSON = "application/x-ndjson"
+
+
+class TestNdjson(unittest.TestCase):
+    def test_sales_are_streamed_one_per_line(self):
+        app = get_app(self)
+        with app.test_client() as client:
+            headers = create_user(client, "ndjson")
+            other_headers = create_user(client, "ndjson other")
+
+            stand_ids = [
+                create_stand(client, headers, "ndjson first"),
+                create_stand(client, headers, "ndjson second"),
+            ]
+            for stand_id, prices in zip(stand_ids, [[1, 2, 3], [4, 5]]):
+                response = client.post(
+                    flask.url_for("stands.sell_lemonade_batch", stand_id=stand_id),
+                    json=[
+                        dict(priceInMicros=price, date=f"2024-06-0{price}T10:00:00Z")
+                        for price in prices
+                    ],
+                    headers=headers,
+                )
+                self.assertEqual(response.json["created"], len(prices))
+
+            my_sales_url = flask.url_for("stands.get_my_sales")
+            stand_sales_url = flask.url_for(
+                "stands.get_my_stand_sales", stand_id=stand_ids[0]
+            )
+            # Lines are written in chunks of STREAM_BATCH_SIZE, so a small
+            # size makes the sales span several chunks.
+            with mock.patch.object(constants, "STREAM_BATCH_SIZE", 2):
+                for url, prices in [
+                    (my_sales_url, [5, 4, 3, 2, 1]),
+                    (stand_sales_url, [3, 2, 1]),
+                ]:
+                    response = client.get(url, headers=dict(headers, Accept=NDJSON))
+                    self.assertEqual(response.status_code, 200)
+                    self.assertEqual(response.mimetype, NDJSON)
+                    self.assertNotIn("Link", response.headers)
+                    lines = response.get_data(as_text=True).splitlines()
+                    sales = [json.loads(line) for line in lines]
+                    self.assertEqual([sale["priceInMicros"] for sale in sales], prices)
+
+                    # Clients accepting anything, or preferring JSON, get a
+                    # page of the same sales.
+                    for accept in ["*/*", f"application/json, {NDJSON};q=0.5"]:
+                        response = client.get(url, headers=dict(headers, Accept=accept))
+                        self.assertEqual(response.mimetype, "application/json")
+                        self.assertEqual(response.json, sales)
+
+            response = client.get(
+                stand_sales_url, headers=dict(other_headers, Accept=NDJSON)
+            )
+            self.assertEqual(response.status_code, 404)
@@ -0,0 +1,76 @@
+import unittest
+from unittest import mock
+
+import flask
+
+import services.stand_search
+from tests import create_stand, create_user, get_app
+
+
+class TestNearMeBatch(unittest.TestCase):
+    def test_batch_is_one_query_without_the_stand_index(self):
+        app = get_app(self, NEAR_ME_CACHE_SIZE="0")
+        with mock.patch.object(
+            services.stand_search,
+            "_get_lemonade_stands_near_points_from_database",
+            wraps=services.stand_search._get_lemonade_stands_near_points_from_database,
+        ) as query:
+            self.check_batch_matches_single_point_lookups(app)
+        self.assertEqual(query.call_count, 1)
+
+    def test_batch_uses_the_stand_index_and_skips_the_near_me_cache(self):
+        app = get_app(self, NEAR_ME_CACHE_SIZE="10000", STAND_INDEX_ENABLED="true")
+        with mock.patch.object(
+            services.stand_search,
+            "_get_lemonade_stands_near_points_from_database",
+        ) as query:
+            self.check_batch_matches_single_point_lookups(app)
+        query.assert_not_called()
+
+    def check_batch_matches_single_point_lookups(self, app: flask.Flask):
+        with app.test_client() as client:
+            headers = create_user(client, "near me batch")
+
+            for name, longitude in [
+                ("near me batch west", -70.010),
+                ("near me batch middle", -70.000),
+                ("near me batch east", -69.990),
+            ]:
+                create_stand(client, headers, name, longitude, -30.0)
+
+            points = [
+                dict(longitude=-70.012, latitude=-30.0),
+                dict(longitude=-69.989, latitude=-30.0),
+                dict(longitude=0.0, latitude=0.0),
+            ]
+            response = client.post(
+                flask.url_for("stands.get_stands_near_points"),
+                json=dict(points=points, radius=5_000, limit=2),
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.json), len(points))
+            for point, nearby in zip(points, response.json):
+                expected = client.get(
+                    flask.url_for("stands.get_stands_near_me"),
+                    query_string=dict(point, radius=5_000, limit=2),
+                ).json
+                self.assertEqual(
+                    [stand["id"] for stand in nearby],
+                    [stand["id"] for stand in expected],
+                )
+            self.assertEqual(
+                [stand["name"] for stand in response.json[0]],
+                ["near me batch west", "near me batch middle"],
+            )
+            self.assertEqual(response.json[2], [])
+
+            response = client.post(
+                flask.url_for("stands.get_stands_near_points"),
+                json=dict(points=[dict(longitude=200, latitude=0)]),
+            )
+            self.assertEqual(response.status_code, 400)
+            response = client.post(
+                flask.url_for("stands.get_stands_near_points"),
+                json=dict(points=[]),
+            )
+            self.assertEqual(response.status_code, 400)
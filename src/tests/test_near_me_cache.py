@@ -0,0 +1,44 @@
+import unittest
+
+import flask
+
+import services.near_me_cache
+from tests import create_stand, create_user, get_app
+
+
+class TestNearMeCache(unittest.TestCase):
+    def test_cache_is_exact_and_evicted_when_stands_change(self):
+        app = get_app(self, NEAR_ME_CACHE_SIZE="10000")
+        with app.test_client() as client:
+            headers = create_user(client, "near me cache")
+
+            create_stand(client, headers, "near me cache west", 12.990000, 55.594707)
+            create_stand(client, headers, "near me cache east", 13.020000, 55.594707)
+
+            with app.app_context():
+                self.assertIsNotNone(services.near_me_cache.get_near_me_cache())
+
+            # Two points in the same geohash cell share a cache entry, but
+            # each gets the distances and order for its own position.
+            url = flask.url_for("stands.get_stands_near_me")
+            west = client.get(
+                url, query_string=dict(longitude=12.9975, latitude=55.5935)
+            ).json
+            east = client.get(
+                url, query_string=dict(longitude=13.0070, latitude=55.5935)
+            ).json
+            self.assertEqual(
+                [stand["name"] for stand in west],
+                ["near me cache west", "near me cache east"],
+            )
+            self.assertEqual(
+                [stand["name"] for stand in east],
+                ["near me cache east", "near me cache west"],
+            )
+            self.assertNotEqual(west[0]["distance"], east[1]["distance"])
+
+            create_stand(client, headers, "near me cache middle", 13.002804, 55.594707)
+            east = client.get(
+                url, query_string=dict(longitude=13.0070, latitude=55.5935)
+            ).json
+            self.assertEqual(east[0]["name"], "near me cache middle")
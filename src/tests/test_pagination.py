@@ -0,0 +1,125 @@
+import unittest
+
+import flask
+
+import constants
+from pagination import decode_cursor, encode_cursor
+from tests import create_stand, create_user, get_app
+
+
+def next_url(response) -> str | None:
+    """Get the URL of the next page from a response's Link header."""
+    link = response.headers.get("Link")
+    if link is None:
+        return None
+
+    url, rel = link.split(";")
+    assert rel.strip() == 'rel="next"', link
+    return url.strip().strip("<>")
+
+
+class TestPagination(unittest.TestCase):
+    def test_cursor_round_trip(self):
+        self.assertEqual(
+            decode_cursor(encode_cursor(["2024-06-01T10:00:00+00:00", 7])),
+            ["2024-06-01T10:00:00+00:00", 7],
+        )
+
+    def test_pages_follow_the_link_header_across_tied_dates(self):
+        app = get_app(self)
+        with app.test_client() as client:
+            headers = create_user(client, "pagination")
+            stand_id = create_stand(client, headers, "pagination stand")
+
+            # Sales at the same time are ordered by id, newest first, so
+            # pages of 3 split both groups of tied dates.
+            dates = ["2024-06-01T10:00:00+00:00"] * 4 + [
+                "2024-06-02T10:00:00+00:00"
+            ] * 4
+            response = client.post(
+                flask.url_for("stands.sell_lemonade_batch", stand_id=stand_id),
+                json=[
+                    dict(priceInMicros=price, date=date)
+                    for price, date in enumerate(dates)
+                ],
+                headers=headers,
+            )
+            self.assertEqual(response.json["created"], len(dates))
+
+            url = flask.url_for("stands.get_my_stand_sales", stand_id=stand_id, limit=3)
+            pages = []
+            while url is not None:
+                response = client.get(url, headers=headers)
+                self.assertEqual(response.status_code, 200)
+                pages.append([sale["priceInMicros"] for sale in response.json])
+                url = next_url(response)
+
+            self.assertEqual(pages, [[7, 6, 5], [4, 3, 2], [1, 0]])
+
+            # A listing of exactly one page has no next page.
+            response = client.get(
+                flask.url_for("stands.get_my_stand_sales", stand_id=stand_id, limit=8),
+                headers=headers,
+            )
+            self.assertEqual(len(response.json), 8)
+            self.assertIsNone(next_url(response))
+
+    def test_limit_is_capped(self):
+        app = get_app(self)
+        with app.test_client() as client:
+            headers = create_user(client, "pagination cap")
+            stand_id = create_stand(client, headers, "pagination cap stand")
+
+            response = client.post(
+                flask.url_for("stands.sell_lemonade_batch", stand_id=stand_id),
+                json=[dict(priceInMicros=1_000_000, date="2024-06-01T10:00:00+00:00")]
+                * (constants.MAX_PAGE_SIZE + 1),
+                headers=headers,
+            )
+            self.assertEqual(response.json["created"], constants.MAX_PAGE_SIZE + 1)
+
+            url = flask.url_for("stands.get_my_stand_sales", stand_id=stand_id)
+            response = client.get(
+                url,
+                query_string=dict(limit=10 * constants.MAX_PAGE_SIZE),
+                headers=headers,
+            )
+            self.assertEqual(len(response.json), constants.MAX_PAGE_SIZE)
+            response = client.get(next_url(response), headers=headers)
+            self.assertEqual(len(response.json), 1)
+            self.assertIsNone(next_url(response))
+
+            for limit in ["0", "-1", "many"]:
+                response = client.get(
+                    url, query_string=dict(limit=limit), headers=headers
+                )
+                self.assertEqual(response.status_code, 422, limit)
+
+    def test_bad_cursors_are_rejected(self):
+        app = get_app(self)
+        with app.test_client() as client:
+            headers = create_user(client, "pagination cursor")
+            create_stand(client, headers, "pagination cursor stand")
+
+            sales_url = flask.url_for("stands.get_my_sales")
+            stands_url = flask.url_for("stands.get_my_stands")
+            stands_cursor = encode_cursor([1])
+            for url, cursor in [
+                (sales_url, "not a cursor!"),
+                (sales_url, encode_cursor(dict(date="2024-06-01"))),
+                # A cursor of another listing, with other sort keys.
+                (sales_url, stands_cursor),
+                (sales_url, encode_cursor([1, 2])),
+                (sales_url, encode_cursor(["yesterday", 2])),
+                (sales_url, encode_cursor(["2024-06-01T10:00:00+00:00", True])),
+                (stands_url, encode_cursor(["1"])),
+            ]:
+                response = client.get(
+                    url, query_string=dict(cursor=cursor), headers=headers
+                )
+                self.assertEqual(response.status_code, 422, (url, cursor))
+
+            response = client.get(
+                stands_url, query_string=dict(cursor=stands_cursor), headers=headers
+            )
+            self.assertEqual(response.status_code, 200)
@@ -0,0 +1,23 @@
+import multiprocessing
+import unittest
+
+from services.password import PasswordHasher
+
+
+class TestPasswordHasher(unittest.TestCase):
+    def test_workers_are_started_eagerly_by_a_fork_server(self):
+        hasher = PasswordHasher(pool_size=2, max_queue_depth=0)
+        self.addCleanup(hasher.shutdown)
+        children = set(multiprocessing.active_children())
+
+        hasher.start()
+
+        workers = set(multiprocessing.active_children()) - children
+        self.assertEqual(len(workers), 2)
+        self.assertTrue(
+            all(type(worker).__name__ == "ForkServerProcess" for worker in workers)
+        )
+
+        password_hash = hasher.generate_password_hash("password")
+        self.assertTrue(hasher.check_password_hash(password_hash, "password"))
+        self.assertFalse(hasher.check_password_hash(password_hash, "wrong"))
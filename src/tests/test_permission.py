@@ -0,0 +1,48 @@
+import unittest
+from unittest import mock
+
+import services.permission
+from services.permission import RolePermissionCache
+
+
+class TestRolePermissionCache(unittest.TestCase):
+    def setUp(self):
+        self.rows = [(1, "read", 10), (2, "write", 10)]
+        patches = [
+            mock.patch.object(services.permission, "db"),
+            mock.patch.object(services.permission, "time"),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+        services.permission.db.session.execute.return_value.all.side_effect = (
+            lambda: list(self.rows)
+        )
+        self.now = 1_000.0
+        services.permission.time.monotonic.side_effect = lambda: self.now
+
+    def test_permissions_are_reloaded_once_older_than_max_age(self):
+        cache = RolePermissionCache(max_age=60)
+        cache.load()
+        self.assertEqual(cache.get([10]), frozenset(["read", "write"]))
+
+        # A permission removed by another process is still cached...
+        self.rows = [(1, "read", 10)]
+        self.now += 30
+        self.assertEqual(cache.get([10]), frozenset(["read", "write"]))
+
+        # ...until the cache is older than max_age.
+        self.now += 31
+        self.assertEqual(cache.get([10]), frozenset(["read"]))
+        self.assertEqual(services.permission.db.session.execute.call_count, 2)
+
+    def test_invalidate_reloads_on_the_next_read(self):
+        cache = RolePermissionCache(max_age=0)
+        cache.load()
+        self.rows = [(1, "read", 10)]
+        self.now += 24 * 60 * 60
+        self.assertEqual(cache.get([10]), frozenset(["read", "write"]))
+
+        cache.invalidate()
+        self.assertEqual(cache.get([10]), frozenset(["read"]))
@@ -0,0 +1,99 @@
+import contextlib
+import datetime
+import threading
+import unittest
+
+import flask
+import sqlalchemy
+
+import constants
+from models import db
+from tests import create_stand, create_user, get_app
+
+
+@contextlib.contextmanager
+def count_queries(app: flask.Flask):
+    """Collect the SQL statements run by the current thread."""
+    statements = []
+    thread_id = threading.get_ident()
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        # Ignore background jobs, like the last seen buffer, flushing.
+        if threading.get_ident() == thread_id:
+            statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+
+    sqlalchemy.event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        sqlalchemy.event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+class TestQueryCounts(unittest.TestCase):
+    def test_stand_listing_query_count_does_not_grow_with_stands(self):
+        app = get_app(self)
+        with app.test_client() as client:
+            headers = create_user(client, "query count")
+
+            for i in range(5):
+                stand_id = create_stand(client, headers, f"query count stand {i}")
+                for _ in range(3):
+                    response = client.post(
+                        flask.url_for("stands.sell_lemonade", stand_id=stand_id),
+                        json=dict(priceInMicros=1_000_000),
+                        headers=headers,
+                    )
+                    self.assertEqual(response.status_code, 201)
+
+            # The access token is cached by now, so only the stands and their
+            # sales are queried.
+            with count_queries(app) as statements:
+                response = client.get("/my/stands", headers=headers)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.json), 5)
+            self.assertTrue(all(len(stand["sales"]) == 3 for stand in response.json))
+            self.assertEqual(len(statements), 2, statements)
+
+            with count_queries(app) as statements:
+                response = client.get(
+                    flask.url_for("stands.get_my_stand", stand_id=stand_id),
+                    headers=headers,
+                )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(statements), 2, statements)
+
+    def test_stand_listing_embeds_only_the_most_recent_sales(self):
+        app = get_app(self)
+        with app.test_client() as client:
+            headers = create_user(client, "recent sales")
+
+            stand_id = create_stand(client, headers, "recent sales stand")
+            sales_count = constants.EMBEDDED_STAND_SALES_LIMIT + 5
+            response = client.post(
+                flask.url_for("stands.sell_lemonade_batch", stand_id=stand_id),
+                json=[
+                    dict(priceInMicros=1_000_000, date=f"2024-06-01T{hour:02}:00:00Z")
+                    for hour in range(sales_count)
+                ],
+                headers=headers,
+            )
+            self.assertEqual(response.json["created"], sales_count)
+
+            with count_queries(app) as statements:
+                response = client.get("/my/stands", headers=headers)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(statements), 2, statements)
+            (stand,) = response.json
+            self.assertEqual(
+                [
+                    datetime.datetime.fromisoformat(sale["date"])
+                    for sale in stand["sales"]
+                ],
+                [
+                    datetime.datetime(2024, 6, 1, hour, tzinfo=datetime.timezone.utc)
+                    for hour in reversed(range(5, sales_count))
+                ],
+            )
@@ -0,0 +1,119 @@
+import datetime
+import json
+import types
+import unittest
+
+import flask
+
+import responses
+from serialization import (
+    GetUserResponse,
+    LemonadeSaleResponse,
+    SalesRelationship,
+    StandClusterResponse,
+    StandResponse,
+)
+
+
+class TestResponses(unittest.TestCase):
+    def test_dump_json_matches_model_dump(self):
+        now = datetime.datetime(2024, 5, 17, 12, 30, tzinfo=datetime.timezone.utc)
+        stand = StandResponse(
+            id=1,
+            name="responses",
+            owner_id="0d7c1c1e-2f3a-4c49-9d0a-1d2b3c4d5e6f",
+            location=(13.002804, 55.594707),
+            created_at=now,
+            updated_at=now,
+            currency="USD",
+            current_price_in_micros=1_000_000,
+            sales=[SalesRelationship(date=now, currency="USD", price_in_micros=1)],
+        )
+        self.assertEqual(
+            json.loads(responses.dump_json([stand], list[StandResponse])),
+            [stand.model_dump(by_alias=True, mode="json")],
+        )
+
+        # ORM objects are read by attribute.
+        sale = types.SimpleNamespace(date=now, currency="USD", price_in_micros=2)
+        self.assertEqual(
+            json.loads(
+                responses.dump_json(
+                    [sale], list[LemonadeSaleResponse], from_attributes=True
+                )
+            ),
+            [{"date": "2024-05-17T12:30:00Z", "currency": "USD", "priceInMicros": 2}],
+        )
+
+    def test_stand_fields_are_left_out_of_larger_clusters(self):
+        clusters = [
+            types.SimpleNamespace(
+                longitude=1.5,
+                latitude=2.5,
+                count=2,
+                id=None,
+                name=None,
+                current_price_in_micros=None,
+                currency=None,
+            ),
+            types.SimpleNamespace(
+                longitude=1.0,
+                latitude=2.0,
+                count=1,
+                id=3,
+                name="cluster",
+                current_price_in_micros=7,
+                currency="USD",
+            ),
+        ]
+        self.assertEqual(
+            json.loads(
+                responses.dump_json(
+                    clusters,
+                    list[StandClusterResponse],
+                    from_attributes=True,
+                    exclude_none=True,
+                )
+            ),
+            [
+                {"longitude": 1.5, "latitude": 2.5, "count": 2},
+                {
+                    "longitude": 1.0,
+                    "latitude": 2.0,
+                    "count": 1,
+                    "id": 3,
+                    "name": "cluster",
+                    "currentPriceInMicros": 7,
+                    "currency": "USD",
+                },
+            ],
+        )
+
+    def test_json_response(self):
+        app = flask.Flask(__name__)
+        user = GetUserResponse(
+            id="1", email="a@b.c", first_name="a", last_name="b", age=9
+        )
+        with app.app_context():
+            response = responses.json_response(user, status=201)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.mimetype, "application/json")
+        self.assertEqual(response.json["firstName"], "a")
+
+    @unittest.skipIf(responses.orjson is None, "orjson is not installed")
+    def test_orjson_provider_matches_default_provider(self):
+        body = dict(
+            name="ä",
+            date=datetime.datetime(2024, 5, 17, tzinfo=datetime.timezone.utc),
+            values=[1, 2.5, None, True],
+        )
+        default_app = flask.Flask(__name__)
+        orjson_app = flask.Flask(__name__)
+        responses.init_app(orjson_app)
+        self.assertIsInstance(orjson_app.json, responses.OrjsonProvider)
+
+        with default_app.app_context():
+            expected = flask.jsonify(body).json
+        with orjson_app.app_context():
+            actual = flask.jsonify(body).json
+        self.assertEqual(actual, expected)
@@ -0,0 +1,63 @@
+import unittest
+import uuid
+
+import flask
+import jwt
+
+import services.auth
+from tests import get_app
+
+
+class TestRevoke(unittest.TestCase):
+    def test_revoked_tokens_are_rejected_even_when_cached(self):
+        app = get_app(self)
+        with app.test_client() as client:
+            email = f"revoke.{uuid.uuid4().hex[:12]}@lemonademail.com"
+            response = client.post(
+                "/users",
+                json=dict(
+                    email=email,
+                    password="password",
+                    first_name="revoke",
+                    last_name="test",
+                    age=99,
+                ),
+            )
+            self.assertEqual(response.status_code, 201)
+            response = client.post(
+                "/auth/login", json=dict(email=email, password="password")
+            )
+            self.assertEqual(response.status_code, 201)
+            access_token = response.json["accessToken"]
+            refresh_token = response.json["refreshToken"]
+            headers = {"Authorization": f"Bearer {access_token}"}
+
+            me_url = flask.url_for("users.get_me")
+            response = client.get(me_url, headers=headers)
+            self.assertEqual(response.status_code, 200)
+            claims = jwt.decode(access_token, options=dict(verify_signature=False))
+            jwtid = claims["jwtid"]
+            with app.app_context():
+                self.assertIsNotNone(services.auth.get_access_token_cache().get(jwtid))
+
+            response = client.post(
+                flask.url_for("auth.revoke"),
+                json=dict(refreshToken=refresh_token),
+                headers=headers,
+            )
+            self.assertEqual(response.status_code, 201)
+
+            response = client.get(me_url, headers=headers)
+            self.assertEqual(response.status_code, 401)
+            response = client.post(
+                flask.url_for("auth.refresh_token"),
+                json=dict(refreshToken=refresh_token),
+            )
+            self.assertEqual(response.status_code, 401)
+
+            # The access token is expired in the database too, for workers
+            # that never cached it or saw the revocation.
+            with app.app_context():
+                services.auth.get_revoked_access_tokens().pop(jwtid)
+            response = client.get(me_url, headers=headers)
+            self.assertEqual(response.status_code, 401)
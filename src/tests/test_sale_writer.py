@@ -0,0 +1,81 @@
+import unittest
+from unittest import mock
+
+import flask
+
+import services.sale_writer
+from exceptions import ServiceUnavailableError
+from services.sale_writer import SaleWriteQueue
+
+
+class TestSaleWriteQueue(unittest.TestCase):
+    def setUp(self):
+        self.batches = []
+        self.bad_sales = set()
+
+        def insert(sales):
+            if any(sale["id"] in self.bad_sales for sale in sales):
+                raise ValueError("bad sale")
+            self.batches.append([sale["id"] for sale in sales])
+
+        patches = [
+            mock.patch.object(
+                services.sale_writer.services.stand,
+                "insert_lemonade_stand_sales",
+                side_effect=insert,
+            ),
+            mock.patch.object(services.sale_writer, "db"),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def create_queue(self, window=0.2, max_batch_size=100) -> SaleWriteQueue:
+        write_queue = SaleWriteQueue(
+            app=flask.Flask(__name__), window=window, max_batch_size=max_batch_size
+        )
+        write_queue.start()
+        self.addCleanup(write_queue.stop)
+        return write_queue
+
+    def test_sales_within_the_window_share_a_commit(self):
+        write_queue = self.create_queue()
+        futures = [write_queue.submit(dict(id=i)) for i in range(5)]
+        for future in futures:
+            self.assertIsNone(future.result(timeout=5))
+
+        self.assertEqual(self.batches, [[0, 1, 2, 3, 4]])
+        self.assertEqual(write_queue.commits, 1)
+        self.assertEqual(write_queue.sales_written, 5)
+
+    def test_batches_are_capped(self):
+        write_queue = self.create_queue(max_batch_size=2)
+        futures = [write_queue.submit(dict(id=i)) for i in range(5)]
+        for future in futures:
+            future.result(timeout=5)
+
+        self.assertEqual(self.batches, [[0, 1], [2, 3], [4]])
+
+    def test_a_failing_sale_does_not_fail_the_others(self):
+        self.bad_sales.add(1)
+        write_queue = self.create_queue()
+        futures = [write_queue.submit(dict(id=i)) for i in range(3)]
+
+        self.assertIsNone(futures[0].result(timeout=5))
+        with self.assertRaises(ValueError):
+            futures[1].result(timeout=5)
+        self.assertIsNone(futures[2].result(timeout=5))
+        self.assertEqual(self.batches, [[0], [2]])
+        self.assertEqual(write_queue.sales_written, 2)
+
+    def test_stop_writes_waiting_sales_and_rejects_new_ones(self):
+        write_queue = self.create_queue(window=10)
+        futures = [write_queue.submit(dict(id=i)) for i in range(3)]
+        write_queue.stop()
+
+        for future in futures:
+            self.assertTrue(future.done())
+            self.assertIsNone(future.result())
+        self.assertEqual(sum(self.batches, []), [0, 1, 2])
+        with self.assertRaises(ServiceUnavailableError):
+            write_queue.submit(dict(id=3))
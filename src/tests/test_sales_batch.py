@@ -0,0 +1,51 @@
+import unittest
+
+import flask
+
+from tests import create_stand, create_user, get_app
+
+
+class TestSalesBatch(unittest.TestCase):
+    def test_valid_sales_are_created_and_invalid_sales_reported(self):
+        app = get_app(self)
+        with app.test_client() as client:
+            headers = create_user(client, "sales batch")
+
+            stand_id = create_stand(client, headers, "sales batch stand")
+            batch_url = flask.url_for("stands.sell_lemonade_batch", stand_id=stand_id)
+
+            response = client.post(
+                batch_url,
+                json=[
+                    dict(priceInMicros=1_000_000, date="2024-06-01T10:00:00+00:00"),
+                    dict(priceInMicros=-1, date="2024-06-01T10:01:00+00:00"),
+                    dict(priceInMicros=2_000_000, date="2024-06-01T10:02:00"),
+                    dict(priceInMicros=3_000_000, date="2024-06-02T23:30:00-02:00"),
+                ],
+                headers=headers,
+            )
+            self.assertEqual(response.status_code, 207)
+            self.assertEqual(response.json["created"], 2)
+            self.assertEqual(
+                [result["status"] for result in response.json["results"]],
+                [201, 400, 400, 201],
+            )
+
+            response = client.get(
+                flask.url_for("stands.get_my_stand_sales", stand_id=stand_id),
+                headers=headers,
+            )
+            self.assertEqual(len(response.json), 2)
+
+            response = client.get(
+                flask.url_for("stands.get_my_stand_stats", stand_id=stand_id),
+                query_string={"from": "2024-06-01", "to": "2024-06-03"},
+                headers=headers,
+            )
+            self.assertEqual(
+                [(day["day"], day["salesCount"]) for day in response.json["days"]],
+                [("2024-06-01", 1), ("2024-06-03", 1)],
+            )
+
+            response = client.post(batch_url, json=dict(), headers=headers)
+            self.assertEqual(response.status_code, 422)
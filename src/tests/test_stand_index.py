@@ -0,0 +1,51 @@
+import random
+import unittest
+
+import services.stand_search
+import services.stand_index
+from tests import create_stand, create_user, get_app
+
+
+class TestStandIndex(unittest.TestCase):
+    def test_index_matches_postgis(self):
+        app = get_app(self, STAND_INDEX_ENABLED="true")
+        random.seed(42)
+        with app.test_client() as client:
+            headers = create_user(client, "stand index")
+
+            # Stands are added after the index is built, so they are only
+            # found if the index is updated as they are created.
+            for i in range(200):
+                create_stand(
+                    client,
+                    headers,
+                    f"stand index stand {i}",
+                    longitude=round(random.uniform(12.5, 13.5), 6),
+                    latitude=round(random.uniform(55.3, 55.9), 6),
+                )
+
+            with app.app_context():
+                index = services.stand_index.get_stand_index()
+                self.assertIsNotNone(index)
+                for _ in range(50):
+                    query = dict(
+                        longitude=random.uniform(12.4, 13.6),
+                        latitude=random.uniform(55.2, 56.0),
+                        radius=random.choice([1_000, 5_000, 20_000, 50_000]),
+                        limit=random.choice([1, 5, 100]),
+                    )
+                    expected = (
+                        services.stand_search._get_lemonade_stands_near_from_database(
+                            **query
+                        )
+                    )
+                    actual = index.nearest(**query)
+                    self.assertEqual(
+                        [stand.id for stand in actual],
+                        [stand.id for stand in expected],
+                        query,
+                    )
+                    for actual_stand, expected_stand in zip(actual, expected):
+                        self.assertAlmostEqual(
+                            actual_stand.distance, expected_stand.distance, delta=0.01
+                        )
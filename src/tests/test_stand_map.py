@@ -0,0 +1,58 @@
+import unittest
+
+import flask
+
+import services.stand_map
+from tests import create_stand, create_user, get_app
+
+
+class TestStandMap(unittest.TestCase):
+    def test_clusters_and_tiles(self):
+        app = get_app(self, STAND_TILE_CACHE_SIZE="10000")
+        with app.test_client() as client:
+            headers = create_user(client, "stand map")
+
+            create_stand(client, headers, "stand map west", 100.0010, -40.0010)
+            create_stand(client, headers, "stand map east", 100.0090, -40.0010)
+
+            with app.app_context():
+                self.assertIsNotNone(services.stand_map.get_stand_tile_cache())
+
+            url = flask.url_for("stands.get_stands_map")
+            area = dict(west=99.99, south=-40.01, east=100.01, north=-39.99)
+            clusters = client.get(url, query_string=dict(area, zoom=2)).json
+            self.assertEqual(len(clusters), 1)
+            self.assertEqual(clusters[0]["count"], 2)
+            self.assertNotIn("name", clusters[0])
+
+            clusters = client.get(url, query_string=dict(area, zoom=16)).json
+            self.assertEqual(
+                sorted(cluster["name"] for cluster in clusters),
+                ["stand map east", "stand map west"],
+            )
+            self.assertTrue(all(cluster["count"] == 1 for cluster in clusters))
+
+            response = client.get(url, query_string=dict(area, west=101, zoom=2))
+            self.assertEqual(response.status_code, 422)
+
+            # At zoom 16 a tile is about 0.0055 degrees, so this area is
+            # more than 8 tiles wide.
+            response = client.get(url, query_string=dict(area, zoom=16, east=100.1))
+            self.assertEqual(response.status_code, 422)
+
+            z, x, y = services.stand_map.tiles_at(100.005, -40.001)[14]
+            tile_url = flask.url_for("stands.get_stands_tile", z=z, x=x, y=y)
+            response = client.get(tile_url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.mimetype, services.stand_map.TILE_MIMETYPE)
+            self.assertIn(b"stand map west", response.data)
+
+            # A new stand evicts the cached tiles it lands in.
+            create_stand(client, headers, "stand map middle", 100.0050, -40.0010)
+            response = client.get(tile_url)
+            self.assertIn(b"stand map middle", response.data)
+
+            response = client.get(
+                flask.url_for("stands.get_stands_tile", z=1, x=2, y=0)
+            )
+            self.assertEqual(response.status_code, 404)
@@ -0,0 +1,59 @@
+import datetime
+import unittest
+
+import flask
+
+from tests import create_stand, create_user, get_app
+
+
+class TestStats(unittest.TestCase):
+    def test_stats_are_rolled_up_as_sales_are_made(self):
+        app = get_app(self)
+        with app.test_client() as client:
+            headers = create_user(client, "stats")
+
+            stand_id = create_stand(client, headers, "stats stand")
+            for price_in_micros in (1_000_000, 2_000_000, 3_000_000):
+                response = client.post(
+                    flask.url_for("stands.sell_lemonade", stand_id=stand_id),
+                    json=dict(priceInMicros=price_in_micros),
+                    headers=headers,
+                )
+                self.assertEqual(response.status_code, 201)
+
+            today = datetime.datetime.now(tz=datetime.timezone.utc).date()
+            stats_url = flask.url_for("stands.get_my_stand_stats", stand_id=stand_id)
+            response = client.get(stats_url, headers=headers)
+            self.assertEqual(response.status_code, 200)
+            expected = dict(currency="USD", salesCount=3, revenueInMicros=6_000_000)
+            self.assertEqual(
+                response.json["days"], [dict(day=today.isoformat(), **expected)]
+            )
+            self.assertEqual(response.json["totals"], [expected])
+            stats = response.json
+
+            # Rebuilding from the raw sales gives the same stats.
+            response = client.post(stats_url, headers=headers)
+            self.assertEqual(response.status_code, 201)
+            response = client.get(stats_url, headers=headers)
+            self.assertEqual(response.json, stats)
+
+            yesterday = today - datetime.timedelta(days=1)
+            response = client.get(
+                stats_url,
+                query_string={
+                    "from": yesterday.isoformat(),
+                    "to": yesterday.isoformat(),
+                },
+                headers=headers,
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json["days"], [])
+            self.assertEqual(response.json["totals"], [])
+
+            response = client.get(
+                stats_url,
+                query_string={"from": today.isoformat(), "to": yesterday.isoformat()},
+                headers=headers,
+            )
+            self.assertEqual(response.status_code, 422)
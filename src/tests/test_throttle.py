@@ -0,0 +1,37 @@
+import unittest
+
+import flask
+
+import services.throttle
+from exceptions import TooManyRequestsError
+
+
+class TestLoginThrottle(unittest.TestCase):
+    def setUp(self):
+        app = flask.Flask(__name__)
+        app.config.update(
+            LOGIN_IP_THROTTLE_RATE=0.0,
+            LOGIN_IP_THROTTLE_BURST=100,
+            LOGIN_EMAIL_THROTTLE_RATE=0.0,
+            LOGIN_EMAIL_THROTTLE_BURST=3,
+            LOGIN_THROTTLE_MAX_KEYS=100,
+        )
+        services.throttle.init_app(app)
+        context = app.app_context()
+        context.push()
+        self.addCleanup(context.pop)
+
+    def test_successful_logins_do_not_count_against_the_email(self):
+        for _ in range(10):
+            services.throttle.throttle_login(ip_address="1.1.1.1", email="a@b.c")
+
+    def test_failed_logins_count_against_the_email_from_that_ip_address(self):
+        for _ in range(3):
+            services.throttle.throttle_login(ip_address="1.1.1.1", email="a@b.c")
+            services.throttle.record_failed_login(ip_address="1.1.1.1", email="a@b.c")
+
+        with self.assertRaises(TooManyRequestsError):
+            services.throttle.throttle_login(ip_address="1.1.1.1", email="a@b.c")
+
+        # The user can still log in from their own address.
+        services.throttle.throttle_login(ip_address="2.2.2.2", email="a@b.c")